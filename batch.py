@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+solve a batch of freecell games (seed ranges, game files, directories of .save files)
+"""
+
+import time
+import argparse
+
+import src.solvers as solver
+import src.bounded as bounded
+import src.batch as batch
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Solve a batch of freecell games, one JSONL record per game")
+    parser.add_argument("deals", nargs="+", help="seeds, seed ranges (0-999), game files or directories")
+    parser.add_argument("-o", "--output", default="batch.jsonl", help="JSONL output file")
+    parser.add_argument("--jobs", type=int, default=0, help="worker processes (0: one per cpu)")
+    parser.add_argument("--max-restarts", type=int, help="give up a game after N restarts")
+    parser.add_argument("--hash", default=solver.HASH_EXACT, choices=solver.HASH_MODES,
+                        help="state hashing mode")
+    parser.add_argument("--engine", default="dfs", choices=sorted(solver.ENGINES),
+                        help="search algorithm (exhaustive: proves unsolvable games)")
+    parser.add_argument("--autoplay", action="store_true", help="apply safe moves to base after each move")
+    parser.add_argument("--max-entries", type=int, help="bound state sets to N entries each (needs zobrist hashing)")
+    parser.add_argument("--eviction", default=bounded.EVICT_DEPTH, choices=bounded.EVICTIONS,
+                        help="eviction policy of bounded state sets")
+    parser.add_argument("--lazy", action="store_true", help="choices by category, hashed only when taken (dfs)")
+    parser.add_argument("--compact", action="store_true", help="solve on the compact board representation")
+    parser.add_argument("--profile", help="solver profile (JSON) of tune.py: categories values, noise, restarts")
+    parser.add_argument("--restarts", metavar="POLICY",
+                        help="restart policy (dfs): %s, optionally with its unit of nodes (luby:500), "
+                        "default: the profile's or fixed" % ", ".join(solver.RESTARTS))
+    parser.add_argument("--scoring", metavar="WEIGHTS",
+                        help="order choices (dfs) with a weight vector: cat (categories) or a JSON weights file")
+    parser.add_argument("--time-budget", type=float, metavar="SECONDS", help="give up a game after this time")
+    parser.add_argument("--node-budget", type=int, metavar="N", help="give up a game after N iterations")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the solver (for each game)")
+    parser.add_argument("--cache", help="file of known dead end & solvable states, shared by workers")
+    parser.add_argument("--shorten", type=float, metavar="SECONDS",
+                        help="search shortcuts in solutions, with this time budget per game")
+    parser.add_argument("--stats", action="store_true", help="add solver counters & timers per restart to records")
+    parser.add_argument("--spill-dir", help="exhaustive engine: spill explored states to files in this directory")
+    parser.add_argument("--overwrite", action="store_true", help="overwrite output instead of resuming")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    deals = batch.parse_deals(args.deals)
+    engine_options = {}
+    if args.engine == "exhaustive":
+        engine_options["spill_dir"] = args.spill_dir
+    nsolved = batch.run_batch(deals, args.output, args.jobs, not args.overwrite,
+                              max_restarts=args.max_restarts, use_compact=args.compact, seed=args.seed,
+                              engine=args.engine, cache=args.cache, shorten_time=args.shorten,
+                              time_budget=args.time_budget, node_budget=args.node_budget,
+                              hashing=args.hash, stats=args.stats,
+                              autoplay=args.autoplay, max_entries=args.max_entries, eviction=args.eviction,
+                              lazy=args.lazy, restarts=args.restarts, scoring=args.scoring, profile=args.profile,
+                              **engine_options)
+
+    print("%d solved, output in %s" % (nsolved, args.output))
+    print("--- runtime: %s seconds ---" % str(time.time() - start_time))
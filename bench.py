@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+benchmark the solver on a fixed corpus of games
+"""
+
+import sys
+import json
+import argparse
+
+import src.solvers as solver
+import src.bounded as bounded
+import src.batch as batch
+import src.bench as bench
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the solver on a fixed corpus of games")
+    parser.add_argument("deals", nargs="*", help="seeds, seed ranges, game files (default: bench corpus)")
+    parser.add_argument("-o", "--output", help="write results (JSON) to this file")
+    parser.add_argument("--compare", help="baseline results (JSON), exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative tolerance of the comparison")
+    parser.add_argument("--max-restarts", type=int, default=bench.MAX_RESTARTS, help="restarts budget per game")
+    parser.add_argument("--hash", default=solver.HASH_EXACT, choices=solver.HASH_MODES,
+                        help="state hashing mode")
+    parser.add_argument("--engine", default="dfs", choices=sorted(solver.ENGINES), help="search algorithm")
+    parser.add_argument("--autoplay", action="store_true", help="apply safe moves to base after each move")
+    parser.add_argument("--max-entries", type=int, help="bound state sets to N entries each (needs zobrist hashing)")
+    parser.add_argument("--eviction", default=bounded.EVICT_DEPTH, choices=bounded.EVICTIONS,
+                        help="eviction policy of bounded state sets")
+    parser.add_argument("--lazy", action="store_true", help="choices by category, hashed only when taken (dfs)")
+    parser.add_argument("--compact", action="store_true", help="solve on the compact board representation")
+    parser.add_argument("--profile", help="solver profile (JSON) of tune.py: categories values, noise, restarts")
+    parser.add_argument("--restarts", metavar="POLICY",
+                        help="restart policy (dfs): %s, optionally with its unit of nodes (luby:500), "
+                        "default: the profile's or fixed" % ", ".join(solver.RESTARTS))
+    parser.add_argument("--scoring", metavar="WEIGHTS",
+                        help="order choices (dfs) with a weight vector: cat (categories) or a JSON weights file")
+    parser.add_argument("--time-budget", type=float, metavar="SECONDS", help="give up a game after this time")
+    parser.add_argument("--node-budget", type=int, metavar="N", help="give up a game after N iterations")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the solver")
+    args = parser.parse_args()
+
+    deals = batch.parse_deals(args.deals) if args.deals else bench.CORPUS
+    results = bench.run_bench(deals, args.max_restarts, args.seed,
+                              use_compact=args.compact, engine=args.engine, hashing=args.hash,
+                              autoplay=args.autoplay, max_entries=args.max_entries, eviction=args.eviction,
+                              lazy=args.lazy, restarts=args.restarts, scoring=args.scoring, profile=args.profile,
+                              time_budget=args.time_budget, node_budget=args.node_budget)
+
+    for name, value in results["summary"].items():
+        print("%-14s %s" % (name, value))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = bench.compare(results["summary"], baseline["summary"], args.tolerance)
+        for r in regressions:
+            print("REGRESSION", r)
+        if regressions:
+            sys.exit(1)
+        print("no regression")
@@ -0,0 +1,22 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+write a binary corpus of freecell games (seed ranges, game files, directories of .save files)
+"""
+
+import argparse
+
+import src.batch as batch
+import src.corpus as corpus
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Write games to a binary corpus file (for batch.py & bench.py)")
+    parser.add_argument("deals", nargs="+", help="seeds, seed ranges (0-999), game files or directories")
+    parser.add_argument("-o", "--output", default="deals.fcc", help="corpus file")
+    args = parser.parse_args()
+
+    n = corpus.write_corpus(args.output, (batch.load_deal(d) for d in batch.parse_deals(args.deals)))
+    print("%d games written in %s" % (n, args.output))
@@ -7,9 +7,11 @@ Simple in terminal freecell game
 
 import sys
 import random
+import argparse
 
 import src.model as m
 import src.save as save
+import src.hints as hints
 
 class TermColor:
     GREEN = '\033[92m'
@@ -74,10 +76,7 @@ def create_game(args): # return game, filename
             
     if game is None:
         print("Game seed:", gid)
-        deck = m.DECK[:]
-        randgen = random.Random(gid)
-        randgen.shuffle(deck)
-        game = m.FCGame(m.FCBoard.init_from_deck(deck))
+        game = m.FCGame(m.FCBoard.init_from_seed(gid))
         filename = "game_%d.save" % gid
     
     return game, filename
@@ -86,7 +85,16 @@ def create_game(args): # return game, filename
 
 if __name__ == "__main__":
 
-    game, game_filename = create_game(sys.argv)
+    parser = argparse.ArgumentParser(description="Play a freecell game in the terminal")
+    parser.add_argument("game", nargs="?", help="game seed or game file (random seed if missing)")
+    parser.add_argument("--hints", help="file of the hints cache (solutions), loaded and saved")
+    parser.add_argument("--hint-budget", type=float, default=hints.HINT_BUDGET, help="time (s) to find a hint")
+    parser.add_argument("--background", action="store_true", help="search hints in background while playing")
+    args = parser.parse_args()
+
+    game, game_filename = create_game([sys.argv[0]] + ([args.game] if args.game else []))
+    hints_cache = hints.SolutionCache(filename=args.hints)
+    hint_engine = hints.HintEngine(hints_cache) if args.background else None
 
     run = True
     moves = []
@@ -99,6 +107,10 @@ if __name__ == "__main__":
         print()
         print(printBoard(game.fcboard))
         print()
+        if hint_engine is not None:
+            hint_engine.set_position(game.fcboard)
+            if hint_engine.is_lost(game.fcboard):
+                print("Warning: this position is lost")
         choices = game.list_choices()
         base_available = False
         i = 0
@@ -111,6 +123,7 @@ if __name__ == "__main__":
             print("B) Automatic to base")
         if len(moves) > 0:
             print("Z) cancel last move")
+        print("H) hint")
         print("S) save")
         print("Q) quit")
         choice_id = input("Move id? ")
@@ -118,6 +131,18 @@ if __name__ == "__main__":
             run = False
         elif choice_id in ["S", "s"]:
             save.save_to_file(game_filename, game.fcboard)
+        elif choice_id in ["H", "h"]:
+            try:
+                if hint_engine is not None:
+                    solution = hint_engine.hint(game.fcboard, args.hint_budget)
+                else:
+                    solution = hints_cache.solve(game.fcboard, args.hint_budget)
+                if solution is None:
+                    print("No hint found")
+                else:
+                    print("Hint:", printChoice(solution[0]), "(%d moves to win)" % len(solution))
+            except IndexError:
+                print("This position is lost")
         elif choice_id in ["Z", "z"] and len(moves) > 0:
             last = moves.pop()
             game.apply(last.get_reverse())
@@ -143,4 +168,7 @@ if __name__ == "__main__":
             else:
                 print("Wrong move id")
 
-
+    if hint_engine is not None:
+        hint_engine.stop()
+    if args.hints:
+        hints_cache.save()
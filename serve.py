@@ -0,0 +1,33 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+run a local freecell solver service (see src/service.py for the requests)
+"""
+
+import argparse
+
+import src.service as service
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Local freecell solver service, JSON over HTTP")
+    parser.add_argument("--port", type=int, default=8765, help="port on localhost")
+    parser.add_argument("--unix", help="listen on this Unix socket file instead of a port")
+    parser.add_argument("--jobs", type=int, default=0, help="solver processes (0: one per cpu)")
+    parser.add_argument("--budget", type=float, default=service.BUDGET, help="default time budget (s) per request")
+    parser.add_argument("--cache-size", type=int, default=service.CACHE_SIZE, help="results kept in cache")
+    parser.add_argument("--verbose", action="store_true", help="log requests")
+    args = parser.parse_args()
+
+    solver_service = service.SolverService(args.jobs, args.budget, args.cache_size)
+    server = service.make_server(solver_service, args.port, args.unix, args.verbose)
+    print("Solver service on %s" % (args.unix or "http://127.0.0.1:%d" % args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        solver_service.close()
@@ -8,14 +8,49 @@ solve a freecell game
 
 import sys
 import time
+import random
+import argparse
 
 import src.solvers as solver
+import src.bounded as bounded
+import src.compact as compact
+import src.parallel as parallel
+import src.store as store
+import src.shorten as shorten
 import play
 
 
 if __name__ == "__main__":
 
-    game, _ = play.create_game(sys.argv)
+    parser = argparse.ArgumentParser(description="Solve a freecell game")
+    parser.add_argument("game", nargs="?", help="game seed or game file (random seed if missing)")
+    parser.add_argument("--hash", default=solver.HASH_EXACT, choices=solver.HASH_MODES,
+                        help="state hashing mode")
+    parser.add_argument("--engine", default="dfs", choices=sorted(solver.ENGINES), help="search algorithm")
+    parser.add_argument("--autoplay", action="store_true", help="apply safe moves to base after each move")
+    parser.add_argument("--max-entries", type=int, help="bound state sets to N entries each (needs zobrist hashing)")
+    parser.add_argument("--eviction", default=bounded.EVICT_DEPTH, choices=bounded.EVICTIONS,
+                        help="eviction policy of bounded state sets")
+    parser.add_argument("--lazy", action="store_true", help="choices by category, hashed only when taken (dfs)")
+    parser.add_argument("--compact", action="store_true", help="solve on the compact board representation")
+    parser.add_argument("--profile", help="solver profile (JSON) of tune.py: categories values, noise, restarts")
+    parser.add_argument("--restarts", metavar="POLICY",
+                        help="restart policy (dfs): %s, optionally with its unit of nodes (luby:500), "
+                        "default: the profile's or fixed" % ", ".join(solver.RESTARTS))
+    parser.add_argument("--scoring", metavar="WEIGHTS",
+                        help="order choices (dfs) with a weight vector: cat (categories) or a JSON weights file")
+    parser.add_argument("--time-budget", type=float, metavar="SECONDS", help="give up the game after this time")
+    parser.add_argument("--node-budget", type=int, metavar="N", help="give up the game after N iterations")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="portfolio of differently seeded solvers in N processes (0: one per cpu)")
+    parser.add_argument("--seed", type=int, help="random seed of the (first) solver")
+    parser.add_argument("--cache", help="file of known dead end & solvable states, loaded and extended")
+    parser.add_argument("--spill-dir", help="exhaustive engine: spill explored states to files in this directory")
+    parser.add_argument("--shorten", type=float, metavar="SECONDS",
+                        help="search shortcuts in the solution, with this time budget")
+    args = parser.parse_args()
+
+    game, _ = play.create_game([sys.argv[0]] + ([args.game] if args.game else []))
 
 #tot_times = 0
 #for i in range(100):
@@ -23,28 +58,61 @@ if __name__ == "__main__":
 
     start_time = time.time()
     
-    solv = solver.Solver(game.fcboard)
+    fcboard = compact.CompactBoard.from_board(game.fcboard) if args.compact else game.fcboard
+    states = store.StateStore(args.cache) if args.cache else None
+    engine_options = {}
+    if args.engine == "exhaustive":
+        engine_options["spill_dir"] = args.spill_dir
+    solv = solver.ENGINES[args.engine](fcboard, hashing=args.hash, autoplay=args.autoplay, store=states,
+                                       max_entries=args.max_entries, eviction=args.eviction, lazy=args.lazy,
+                                       restarts=args.restarts, scoring=args.scoring, profile=args.profile,
+                                       **engine_options)
+    if args.engine == "exhaustive":
+        solv.progress = lambda info: print("explored %(states)d states, depth %(depth)d" % info)
+    random.seed(args.seed)
     
     print(play.printBoard(game.fcboard))
     print("Finding solution...")
-    continu = True
-    while continu:
-        try:
-            res = solv.solve()
-            if res[0]:
-                print("iter %d:" % solv.called, "found", "in %d moves" % len(res[1]))
-                reduced = solver.moves_reducer(game.fcboard, res[1])
-                print("reduced to %d moves" % len(reduced))
-                continu = False
-
-                for m in reduced:
-                    print(play.printChoice(m))
-
-            else:
-                print("iter %d:" % solv.called, "notfound")
-        except IndexError:
+    solution = None
+    if args.jobs != 1:
+        res = parallel.portfolio_solve(fcboard, args.jobs, args.seed, args.engine, args.cache,
+                                       time_budget=args.time_budget, node_budget=args.node_budget,
+                                       hashing=args.hash, autoplay=args.autoplay,
+                                       max_entries=args.max_entries, eviction=args.eviction,
+                                       lazy=args.lazy, restarts=args.restarts,
+                                       scoring=args.scoring, profile=args.profile,
+                                       **engine_options)
+        if res["solved"]:
+            print("seed %d, iter %d:" % (res["seed"], res["restarts"] - 1), "found", "in %d moves" % len(res["moves"]))
+            solution = res["moves"]
+        elif res["unsolvable"]:
             print("Not solvable!")
-            continu = False
+        else:
+            print("Timeout, best: %d cards in base" % res["max_in_base"])
+    else:
+        res = solver.solve_until(solv, args.time_budget, args.node_budget,
+                                 progress=lambda r: print("iter %d:" % solv.called, "notfound"))
+        if res["solved"]:
+            print("iter %d:" % solv.called, "found", "in %d moves" % len(res["moves"]))
+            solution = res["moves"]
+        elif res["unsolvable"]:
+            print("Not solvable!")
+        else:
+            print("Timeout, best: %d cards in base" % res["max_in_base"])
+        if states is not None:
+            states.save()
+
+    if solution is not None:
+        reduced = solver.moves_reducer(fcboard, solution)
+        print("reduced to %d moves" % len(reduced))
+        if args.shorten is not None:
+            reduced = shorten.shorten(fcboard, reduced, time_budget=args.shorten)
+            print("shortened to %d moves" % len(reduced))
+        if args.compact:
+            reduced = compact.to_choices(reduced)
+
+        for m in reduced:
+            print(play.printChoice(m))
     
     timespend = time.time() - start_time
     print("--- runtime: %s seconds ---" % str(timespend))
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Asyncio solve API: each restart of the solver runs in an executor (default: the loop's thread pool),
+the event loop gets control back between restarts for progress events, deadlines & cancellation.
+"""
+
+import time
+import asyncio
+import inspect
+import functools
+
+import src.model as model
+import src.solvers as solver
+
+async def solve_events(fcboard, engine="dfs", timeout=None, executor=None, **kwargs):
+    """
+    Async iterator of progress events, one per restart (restart: its index from 0):
+        {"restart", "max_in_base", "nodes", "time", "done": False}
+    the last one has "done": True and "solved", "unsolvable", "moves"
+    raise asyncio.TimeoutError when timeout (s) is reached (deadline of each restart)
+    kwargs: solver options
+    """
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
+    deadline = start_time + timeout if timeout is not None else None
+    solv = solver.ENGINES[engine](fcboard, **kwargs)
+    while True:
+        event = {"restart": solv.called + 1, "done": False}
+        try:
+            res = await loop.run_in_executor(executor, functools.partial(solv.solve, None, deadline))
+        except IndexError:
+            event.update(done=True, solved=False, unsolvable=True, moves=None, max_in_base=None,
+                         nodes=solv.last_iterations)
+        else:
+            event["nodes"] = res[2]
+            if res[0]:
+                event.update(done=True, solved=True, unsolvable=False, moves=res[1], max_in_base=len(model.DECK))
+            else:
+                event["max_in_base"] = res[1]
+        event["time"] = round(time.time() - start_time, 4)
+        yield event
+        if event["done"]:
+            return
+        if deadline is not None and time.time() >= deadline:
+            raise asyncio.TimeoutError("no solution after %s s" % timeout)
+
+async def solve_async(fcboard, engine="dfs", timeout=None, progress=None, executor=None, **kwargs):
+    """
+    Solve fcboard without blocking the event loop, cancel the task to stop the search
+    (the restart in progress ends in its executor)
+    return: True, list of moves, index of the last restart
+            False, None, index of the last restart if the game is not solvable
+    raise asyncio.TimeoutError when timeout (s) is reached
+    progress: function or coroutine function, called with each event of solve_events
+    """
+    async for event in solve_events(fcboard, engine, timeout, executor, **kwargs):
+        if progress is not None:
+            ret = progress(event)
+            if inspect.isawaitable(ret):
+                await ret
+        if event["done"]:
+            return event["solved"], event["moves"], event["restart"]
@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Solve many deals (seeds or game files) in a worker pool, one JSONL record per deal
+"""
+
+import os
+import json
+import time
+import random
+import multiprocessing
+
+import src.model as m
+import src.save as save
+import src.solvers as solver
+import src.compact as compact
+import src.store as store
+import src.shorten as shorten
+import src.corpus as corpus
+
+def parse_deals(specs):
+    """
+    specs: seeds ("12"), seed ranges ("0-999", end included), game files,
+    directories of .save files or corpus files (deals "file:index")
+    return: list of deal ids (str)
+    """
+    deals = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            deals.extend(sorted(os.path.join(spec, f) for f in os.listdir(spec) if f.endswith(".save")))
+        elif corpus.is_corpus(spec):
+            c = corpus.Corpus(spec)
+            deals.extend("%s:%d" % (spec, i) for i in range(len(c)))
+            c.close()
+        elif os.path.isfile(spec):
+            deals.append(spec)
+        elif "-" in spec[1:]:
+            start, end = spec.split("-", 1)
+            deals.extend(str(gid) for gid in range(int(start), int(end)+1))
+        else:
+            deals.append(str(int(spec)))
+    return deals
+
+_corpora = {} # corpus files opened by this process
+
+def load_deal(deal):
+    try:
+        return m.FCBoard.init_from_seed(int(deal))
+    except ValueError:
+        pass
+    filename, sep, index = deal.rpartition(":")
+    if sep and index.isdigit() and corpus.is_corpus(filename):
+        if filename not in _corpora:
+            _corpora[filename] = corpus.Corpus(filename)
+        return _corpora[filename][int(index)]
+    return save.load_from_file(deal, verbose=False)
+
+def solve_deal(deal, max_restarts=None, use_compact=False, seed=0, engine="dfs", cache=None, shorten_time=None,
+               time_budget=None, node_budget=None, **kwargs):
+    """
+    Solve one deal, return its record (dict), with solver stats per restart
+    and memory usage if stats
+    cache: StateStore file, loaded and extended with this deal
+    shorten_time: time budget (s) of shortcuts search in the reduced solution (None: no search)
+    time_budget, node_budget: give up after these seconds / iterations (timeout, best max_in_base recorded)
+    kwargs: solver options (hashing, stats, autoplay, max_entries, restarts...)
+    """
+    start_time = time.time()
+    random.seed(seed)
+    fcboard = load_deal(deal)
+    if use_compact:
+        fcboard = compact.CompactBoard.from_board(fcboard)
+    states = store.StateStore(cache) if cache else None
+    solv = solver.ENGINES[engine](fcboard, store=states, **kwargs)
+
+    res = solver.solve_until(solv, time_budget, node_budget, max_restarts)
+    solution = res["moves"]
+    record = {"deal": deal, "solved": False, "unsolvable": res["unsolvable"], "timeout": res["timeout"],
+              "restarts": res["restarts"], "iterations": res["iterations"], "max_in_base": res["max_in_base"],
+              "moves": None, "reduced": None, "shortened": None}
+    record["search_time"] = round(time.time() - start_time, 4)
+    if states is not None:
+        states.save()
+
+    if solution is not None:
+        record["solved"] = True
+        record["moves"] = len(solution)
+        reduced = solver.moves_reducer(fcboard, solution)
+        record["reduced"] = len(reduced)
+        if shorten_time is not None:
+            record["shortened"] = len(shorten.shorten(fcboard, reduced, time_budget=shorten_time))
+    record["time"] = round(time.time() - start_time, 4)
+    if kwargs.get("stats"):
+        record["stats"] = solv.stats_dicts()
+        record["memory"] = solv.memory_usage()
+    return record
+
+def _solve_deal_worker(args):
+    """ record of solve_deal, or an error record if the deal cannot be loaded or solved """
+    deal, kwargs = args
+    try:
+        return solve_deal(deal, **kwargs)
+    except Exception as e:
+        return {"deal": deal, "solved": False, "error": "%s: %s" % (type(e).__name__, e)}
+
+def done_deals(output):
+    """ deals already in a JSONL output file, an interrupted last line is removed """
+    done = set()
+    if os.path.exists(output):
+        valid = 0
+        with open(output, "rb+") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    done.add(json.loads(line)["deal"])
+                except ValueError:
+                    break
+                valid += len(line)
+            f.truncate(valid)
+    return done
+
+def run_batch(deals, output, jobs=None, resume=True, **kwargs):
+    """
+    Solve deals in a pool of `jobs` processes (default: one per cpu), append records
+    to `output` as they come (error record for a deal that fails, the batch goes on).
+    With resume, deals already in output are skipped, failed ones included.
+    kwargs: see solve_deal
+    return: number of deals solved in this run
+    """
+    if resume:
+        done = done_deals(output)
+        deals = [d for d in deals if d not in done]
+    else:
+        open(output, "w").close()
+
+    nsolved = 0
+    pool = multiprocessing.Pool(jobs or multiprocessing.cpu_count())
+    try:
+        with open(output, "a") as f:
+            for record in pool.imap_unordered(_solve_deal_worker, [(d, kwargs) for d in deals]):
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                nsolved += record["solved"]
+    finally:
+        pool.terminate()
+        pool.join()
+    return nsolved
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Solver benchmark: fixed corpus of games, seeded runs, summary & comparison with a baseline
+"""
+
+import os
+import resource
+import multiprocessing
+
+import src.batch as batch
+
+IMPOSSIBLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "impossible")
+CORPUS = [str(gid) for gid in range(30)] + [IMPOSSIBLE]
+MAX_RESTARTS = 20
+
+# summary metrics compared with a baseline: (name, True if higher is better)
+METRICS = [("solve_rate", True), ("nodes_per_sec", True), ("mean_restarts", False),
+           ("mean_time", False), ("median_time", False), ("p90_time", False),
+           ("mean_reduced", False), ("peak_memory", False)]
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0
+
+def _quantile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0
+
+def summarize(records):
+    solved = [r for r in records if r["solved"]]
+    search_time = sum([r["search_time"] for r in records])
+    return {
+        "deals": len(records),
+        "solved": len(solved),
+        "solve_rate": len(solved) / len(records) if records else 0,
+        "nodes_per_sec": sum([r["iterations"] for r in records]) / search_time if search_time else 0,
+        "mean_restarts": _mean([r["restarts"] for r in solved]),
+        "mean_time": _mean([r["time"] for r in solved]),
+        "median_time": _quantile([r["time"] for r in solved], 0.5),
+        "p90_time": _quantile([r["time"] for r in solved], 0.9),
+        "mean_moves": _mean([r["moves"] for r in solved]),
+        "mean_reduced": _mean([r["reduced"] for r in solved]),
+        "total_time": sum([r["time"] for r in records]),
+        "peak_memory": max([r["peak_memory"] for r in records]) if records else None,
+    }
+
+def _peak_memory():
+    """ peak resident memory (bytes) of this process: VmHWM, else ru_maxrss (kept from the parent by fork & exec) """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _bench_worker(args):
+    deal, kwargs = args
+    record = batch.solve_deal(deal, **kwargs)
+    record["peak_memory"] = _peak_memory()
+    return record
+
+def run_bench(deals=CORPUS, max_restarts=MAX_RESTARTS, seed=0, **kwargs):
+    """
+    Solve each deal with the same random seed (restarts, moves... are reproducible),
+    one after the other, each one in a new spawned process to get its peak memory
+    (a forked one shares the pages of the parent).
+    kwargs: see batch.solve_deal
+    return: {"config", "deals": [records], "summary"}
+    """
+    config = dict(kwargs, max_restarts=max_restarts, seed=seed)
+    pool = multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1)
+    try:
+        records = pool.map(_bench_worker, [(d, config) for d in deals], chunksize=1)
+    finally:
+        pool.terminate()
+        pool.join()
+    return {"config": config, "deals": records, "summary": summarize(records)}
+
+def compare(summary, baseline, tolerance=0.1):
+    """ return: list of regressions (str) of summary against baseline summary """
+    regressions = []
+    for name, higher_better in METRICS:
+        new, old = summary.get(name), baseline.get(name)
+        if new is None or old is None:
+            continue
+        if higher_better:
+            regressed = new < old * (1 - tolerance) if name != "solve_rate" else new < old
+        else:
+            regressed = new > old * (1 + tolerance)
+        if regressed:
+            regressions.append("%s: %s -> %s" % (name, old, new))
+    return regressions
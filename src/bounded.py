@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Fixed size set of states (64-bit zobrist keys), for solvers with a bounded memory
+"""
+
+import sys
+from array import array
+
+BUCKET = 4
+ENTRY_BYTES = 16 # key + depth/age
+EVICT_DEPTH = "depth"   # replace the deepest state of the bucket (keep shallow dead ends)
+EVICT_LRU = "lru"       # replace the least recently used state of the bucket
+EVICTIONS = [EVICT_DEPTH, EVICT_LRU]
+
+class BoundedStateSet(object):
+    """
+    Keys are stored in buckets of BUCKET slots (open addressing by key % nb buckets),
+    a full bucket evicts one of its keys. Memory is allocated once: ENTRY_BYTES per entry.
+    """
+    def __init__(self, max_entries=None, max_bytes=None, policy=EVICT_DEPTH):
+        if policy not in EVICTIONS:
+            raise ValueError("Unknown eviction policy: %s" % policy)
+        if max_entries is None:
+            if max_bytes is None:
+                raise ValueError("max_entries or max_bytes is needed")
+            max_entries = max_bytes // ENTRY_BYTES
+        self.nbuckets = max(1, max_entries // BUCKET)
+        self.policy = policy
+        self.keys = array("Q", bytes(8 * self.nbuckets * BUCKET))  # 0: empty slot
+        self.info = array("Q", bytes(8 * self.nbuckets * BUCKET))  # depth or last use
+        self.count = 0
+        self.evictions = 0
+        self._tick = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        key = key or 1
+        keys = self.keys
+        i = (key % self.nbuckets) * BUCKET
+        for j in range(i, i + BUCKET):
+            if keys[j] == key:
+                if self.policy == EVICT_LRU:
+                    self._tick += 1
+                    self.info[j] = self._tick
+                return True
+        return False
+
+    def add(self, key, depth=0):
+        key = key or 1
+        keys, info = self.keys, self.info
+        i = (key % self.nbuckets) * BUCKET
+        slot = None
+        for j in range(i, i + BUCKET):
+            if keys[j] == key or keys[j] == 0:
+                slot = j
+                break
+        if slot is None:
+            # full bucket: highest depth or oldest use is evicted
+            if self.policy == EVICT_DEPTH:
+                slot = max(range(i, i + BUCKET), key=info.__getitem__)
+            else:
+                slot = min(range(i, i + BUCKET), key=info.__getitem__)
+            self.evictions += 1
+        elif keys[slot] == 0:
+            self.count += 1
+
+        keys[slot] = key
+        if self.policy == EVICT_DEPTH:
+            info[slot] = depth
+        else:
+            self._tick += 1
+            info[slot] = self._tick
+
+    def nbytes(self):
+        return self.keys.itemsize * len(self.keys) + self.info.itemsize * len(self.info)
+
+def set_nbytes(states):
+    """ memory used by a set of states (python set, BoundedStateSet or SpillStateSet) """
+    if hasattr(states, "nbytes"):
+        return states.nbytes()
+    size = sys.getsizeof(states)
+    for key in states:
+        size += sys.getsizeof(key)
+        if isinstance(key, tuple):
+            size += sum([sys.getsizeof(k) for k in key])
+    return size
@@ -0,0 +1,375 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Compact freecell board for the solver: cards are their uid (num << 2 | suit index),
+columns are bytearrays, bases are 4 counters and freecells a bitmask of uids.
+Card objects are only used to convert from/to model.FCBoard (files, display).
+"""
+
+import src.model as m
+
+CARDS = m.CARD_BY_UID # {uid: Card}
+RED_IDX = [m.SUITS.index(k) for k in m.RED]
+BLACK_IDX = [m.SUITS.index(k) for k in m.BLACK]
+ONE_CARD = [bytes((uid,)) for uid in range(len(CARDS))] # cards of single card choices, by uid
+# hashing, module level names for the hot paths
+ZKEY_COL, ZKEY_FC, MOVE_KEY_MIX, MASK64, zmix = m.ZKEY_COL, m.ZKEY_FC, m.MOVE_KEY_MIX, m.MASK64, m.zmix
+
+
+def fits_on(uid, other):
+    """ card uid can be put on card other in a column (one lower, other color) """
+    return (other >> 2) - (uid >> 2) == 1 and ((uid & 3) in RED_IDX) != ((other & 3) in RED_IDX)
+
+def freecell_cards(fcmask):
+    """ uids in a freecell bitmask """
+    cards = []
+    while fcmask:
+        low = fcmask & -fcmask
+        cards.append(low.bit_length() - 1)
+        fcmask ^= low
+    return cards
+
+
+class CompactBoard(object):
+    __slots__ = ("freecells", "bases", "columns", "_col_zhash", "_col_zmix", "_fc_zhash", "_cols_zhash", "zhash")
+
+    def __init__(self, freecells, bases, columns):
+        self.freecells = freecells  # int, bit uid set for each card in freecell
+        self.bases = bases          # bytearray[4], number of cards per suit (model.SUITS order)
+        self.columns = columns      # list[8][bytearray]
+        self._init_zhash()
+
+    def _init_zhash(self):
+        # same keys as FCBoard: both representations of a state have the same zhash
+        self._col_zhash = []
+        for col in self.columns:
+            h = 0
+            for j, uid in enumerate(col):
+                h ^= m.ZKEY_COL[j][uid]
+            self._col_zhash.append(h)
+        self._fc_zhash = 0
+        for uid in freecell_cards(self.freecells):
+            self._fc_zhash ^= m.ZKEY_FC[uid]
+        self._col_zmix = [m.zmix(h) for h in self._col_zhash]
+        self._cols_zhash = sum(self._col_zmix) & m.MASK64
+        self.zhash = self._cols_zhash ^ self._fc_zhash
+
+    @classmethod
+    def from_board(cls, fcboard):
+        fcmask = 0
+        for c in fcboard.freecells:
+            fcmask |= 1 << c.uid
+        bases = bytearray(fcboard.bases_len())
+        columns = [bytearray([c.uid for c in col]) for col in fcboard.columns]
+        return cls(fcmask, bases, columns)
+
+    def to_board(self):
+        freecells = [CARDS[uid] for uid in freecell_cards(self.freecells)]
+        bases = dict((k, [m.Card(k, n) for n in range(1, self.bases[i]+1)]) for i, k in enumerate(m.SUITS))
+        columns = [[CARDS[uid] for uid in col] for col in self.columns]
+        return m.FCBoard(freecells, bases, columns)
+
+    def clone(self):
+        n = CompactBoard.__new__(CompactBoard)
+        n.freecells = self.freecells
+        n.bases = bytearray(self.bases)
+        n.columns = [bytearray(col) for col in self.columns]
+        n._col_zhash = list(self._col_zhash)
+        n._col_zmix = list(self._col_zmix)
+        n._fc_zhash = self._fc_zhash
+        n._cols_zhash = self._cols_zhash
+        n.zhash = self.zhash
+        return n
+
+    def new_game(self):
+        return CompactGame(self.clone())
+
+    def validate(self, moves):
+        """ See model.FCBoard.validate """
+        game = self.new_game()
+        return game.replay(moves) == len(moves) and game.fcboard.is_won()
+
+    def nb_freecells(self):
+        return bin(self.freecells).count("1")
+
+    def disorder(self):
+        n = 0
+        for col in self.columns:
+            low = len(m.CARD_VALUE) + 1
+            for uid in col:
+                if (uid >> 2) > low:
+                    n += 1
+                else:
+                    low = uid >> 2
+        return n
+
+    def is_won(self):
+        return sum(self.bases) == len(m.DECK)
+
+    def in_base(self):
+        return sum(self.bases)
+
+    def bases_len(self):
+        return list(self.bases)
+
+    def apply(self, choice):
+        cards = choice.cards
+        c0 = cards[0]
+
+        # From origin
+        if choice.col_orig == m.COL_FC:
+            self.freecells ^= 1 << c0
+            self._fc_zhash ^= ZKEY_FC[c0]
+        elif choice.col_orig == m.COL_BASE:
+            self.bases[c0 & 3] -= 1
+        else:
+            col = self.columns[choice.col_orig]
+            h = self._col_zhash[choice.col_orig]
+            for _ in cards:
+                h ^= ZKEY_COL[len(col)-1][col.pop()]
+            self._set_col_zhash(choice.col_orig, h)
+
+        # To dest
+        if choice.col_dest == m.COL_BASE:
+            self.bases[c0 & 3] += 1
+        elif choice.col_dest == m.COL_FC:
+            self.freecells |= 1 << c0
+            self._fc_zhash ^= ZKEY_FC[c0]
+        else:
+            col = self.columns[choice.col_dest]
+            h = self._col_zhash[choice.col_dest]
+            for uid in cards:
+                h ^= ZKEY_COL[len(col)][uid]
+                col.append(uid)
+            self._set_col_zhash(choice.col_dest, h)
+
+        self.zhash = self._cols_zhash ^ self._fc_zhash
+
+    def _set_col_zhash(self, col_id, h):
+        mixed = zmix(h)
+        self._cols_zhash = (self._cols_zhash - self._col_zmix[col_id] + mixed) & MASK64
+        self._col_zhash[col_id] = h
+        self._col_zmix[col_id] = mixed
+
+    def position_key(self):
+        return (self._fc_zhash,) + tuple(self._col_zhash)
+
+    def move_key(self, choice):
+        """ See model.FCBoard.move_key """
+        cards_h = 0
+        col_orig, cards = choice.col_orig, choice.cards
+        if col_orig == m.COL_FC or col_orig == m.COL_BASE:
+            orig = MOVE_KEY_MIX[col_orig]
+            for uid in cards:
+                cards_h ^= ZKEY_FC[uid]
+        else:
+            orig = self._col_zhash[col_orig]
+            j = len(self.columns[col_orig]) - len(cards)
+            for uid in cards:
+                cards_h ^= ZKEY_FC[uid]
+                orig ^= ZKEY_COL[j][uid]
+                j += 1
+            orig = zmix(orig)
+
+        dest = MOVE_KEY_MIX.get(choice.col_dest)
+        if dest is None:
+            dest = self._col_zmix[choice.col_dest]
+        return cards_h ^ ((orig + dest) & MASK64)
+
+    def compute_hash(self):
+        # bytes key: freecell mask then sorted columns (uid < 0xff, so 0xff separates columns)
+        return self.freecells.to_bytes(7, "little") + b"\xff".join(sorted(self.columns))
+
+
+class CompactChoice(m.Choice):
+    __slots__ = ()
+
+    # cards are bytes of uids
+    def to_choice(self):
+        return m.Choice([CARDS[uid] for uid in self.cards], self.col_orig, self.col_dest)
+
+def to_choices(moves):
+    return [c.to_choice() for c in moves]
+
+
+class CompactGame(object):
+    __slots__ = ("fcboard", "_card_col", "_card_idx", "_serie_start", "_freecells", "_last_max_mvt")
+
+    def __init__(self, fcboard):
+        self.fcboard = fcboard
+
+        # same indexes as model.FCGame, updated by apply: location of cards by uid & series start
+        self._card_col = [None] * len(CARDS)
+        self._card_idx = [0] * len(CARDS)
+        self._freecells = freecell_cards(fcboard.freecells)
+        for uid in self._freecells:
+            self._card_col[uid] = m.COL_FC
+        for i, n in enumerate(fcboard.bases):
+            for num in range(1, n+1):
+                self._card_col[(num << 2) + i] = m.COL_BASE
+        for cid, col in enumerate(fcboard.columns):
+            for idx, uid in enumerate(col):
+                self._card_col[uid] = cid
+                self._card_idx[uid] = idx
+        self._serie_start = [self._get_serie_start(i) for i in range(m.COLUMN)]
+        self._last_max_mvt = 0
+
+    def _get_serie_start(self, col_id):
+        col = self.fcboard.columns[col_id]
+        i = len(col) - 1
+        while i > 0 and fits_on(col[i], col[i-1]):
+            i -= 1
+        return max(i, 0)
+
+    def serie_len(self, col_id):
+        return len(self.fcboard.columns[col_id]) - self._serie_start[col_id]
+
+    def suit_index(self, uid):
+        return uid & 3
+
+    def _compute_mvt_max(self):
+        freecol = sum([len(col) == 0 for col in self.fcboard.columns])
+        free_fc = 1 + m.FREECELL - len(self._freecells)
+        max_mvt = free_fc * (1 + freecol)
+        max_mvt_empty = free_fc * freecol
+        self._last_max_mvt = max_mvt
+        return max_mvt, max_mvt_empty
+
+    def list_choices(self):
+        """ Same choices as model.FCGame.list_choices """
+        choices = []
+        max_mvt, max_mvt_empty = self._compute_mvt_max()
+        bases = self.fcboard.bases
+        columns = self.fcboard.columns
+        freecells = self._freecells
+        card_col, card_idx, serie_start = self._card_col, self._card_idx, self._serie_start
+
+        # Bases from freecell
+        for c in freecells:
+            if (c >> 2) == bases[c & 3] + 1:
+                choices.append(CompactChoice(ONE_CARD[c], m.COL_FC, m.COL_BASE))
+
+        # Columns
+        for cid in range(m.COLUMN):
+            col = columns[cid]
+            if len(col) > 0:
+                last_card = col[-1]
+
+                # to Base
+                if (last_card >> 2) == bases[last_card & 3] + 1:
+                    choices.append(CompactChoice(ONE_CARD[last_card], cid, m.COL_BASE))
+
+                # Search specific cards (one lower, other color) from their location
+                for c in m.WANTED[last_card]:
+                    cid2 = card_col[c]
+                    if cid2 == m.COL_FC:
+                        choices.append(CompactChoice(ONE_CARD[c], m.COL_FC, cid))
+                    elif cid2 is not None and cid2 != m.COL_BASE and cid2 != cid:
+                        idx = card_idx[c]
+                        col2 = columns[cid2]
+                        if idx >= serie_start[cid2] and (len(col2) - idx) <= max_mvt:
+                            choices.append(CompactChoice(bytes(col2[idx:]), cid2, cid))
+
+                # to Freecell
+                if len(freecells) < m.FREECELL:
+                    choices.append(CompactChoice(ONE_CARD[last_card], cid, m.COL_FC))
+            else:
+                # from Freecell
+                for c in freecells:
+                    choices.append(CompactChoice(ONE_CARD[c], m.COL_FC, cid))
+
+                # from other columns
+                for cid2 in range(m.COLUMN):
+                    if cid == cid2:
+                        continue
+                    col2 = columns[cid2]
+                    for j in range(max(serie_start[cid2], len(col2)-max_mvt_empty), len(col2)):
+                        choices.append(CompactChoice(bytes(col2[j:]), cid2, cid))
+
+        return choices
+
+    def is_legal(self, choice):
+        """ See model.FCGame.is_legal """
+        cards, orig, dest = choice.cards, choice.col_orig, choice.col_dest
+        n = len(cards)
+        if n == 0 or orig == dest or orig == m.COL_BASE:
+            return False
+        c = cards[0]
+        if orig == m.COL_FC:
+            if n != 1 or self._card_col[c] != m.COL_FC:
+                return False
+        else:
+            col = self.fcboard.columns[orig]
+            if len(col) - n < self._serie_start[orig] or col[-n:] != cards:
+                return False
+
+        if dest == m.COL_BASE:
+            return n == 1 and (c >> 2) == self.fcboard.bases[c & 3] + 1
+        if dest == m.COL_FC:
+            return n == 1 and orig != m.COL_FC and len(self._freecells) < m.FREECELL
+        max_mvt, max_mvt_empty = self._compute_mvt_max()
+        col = self.fcboard.columns[dest]
+        if len(col) == 0:
+            return n <= max_mvt_empty
+        return n <= max_mvt and fits_on(c, col[-1])
+
+    def replay(self, moves):
+        """ See model.FCGame.replay """
+        for i, choice in enumerate(moves):
+            if not self.is_legal(choice):
+                return i
+            self.apply(choice)
+        return len(moves)
+
+    def apply(self, choice):
+        dest = choice.col_dest
+        if dest != m.COL_FC and dest != m.COL_BASE:
+            dest_len = len(self.fcboard.columns[dest])
+        self.fcboard.apply(choice)
+
+        # update locations, freecells & series start of the 2 columns
+        orig = choice.col_orig
+        if orig == m.COL_FC:
+            self._freecells.remove(choice.cards[0])
+        elif orig != m.COL_BASE:
+            if len(self.fcboard.columns[orig]) <= self._serie_start[orig]:
+                self._serie_start[orig] = self._get_serie_start(orig)
+
+        if dest == m.COL_FC or dest == m.COL_BASE:
+            self._card_col[choice.cards[0]] = dest
+            if dest == m.COL_FC:
+                self._freecells.append(choice.cards[0])
+        else:
+            col = self.fcboard.columns[dest]
+            for idx in range(dest_len, len(col)):
+                self._card_col[col[idx]] = dest
+                self._card_idx[col[idx]] = idx
+            if dest_len == 0:
+                self._serie_start[dest] = 0
+            elif not fits_on(col[dest_len], col[dest_len-1]):
+                self._serie_start[dest] = dest_len
+
+    def _safe_to_base(self, uid, bases):
+        num = uid >> 2
+        if num != bases[uid & 3] + 1:
+            return False
+        other = BLACK_IDX if (uid & 3) in RED_IDX else RED_IDX
+        return num <= 2 or min(bases[other[0]], bases[other[1]]) >= num - 1
+
+    def auto_to_base(self):
+        """ See model.FCGame.auto_to_base """
+        done = []
+        found = True
+        while found:
+            found = False
+            bases = self.fcboard.bases
+            choices = [CompactChoice(ONE_CARD[c], m.COL_FC, m.COL_BASE)
+                       for c in self._freecells if self._safe_to_base(c, bases)]
+            choices.extend(CompactChoice(ONE_CARD[col[-1]], cid, m.COL_BASE) for cid, col in enumerate(self.fcboard.columns)
+                           if len(col) > 0 and self._safe_to_base(col[-1], bases))
+            for choice in choices:
+                self.apply(choice)
+                done.append(choice)
+                found = True
+        return done
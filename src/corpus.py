@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Binary corpus of deals: fixed size records of card uids, read through mmap.
+
+Record (68 bytes): 4 bases heights (SUITS order), 4 freecells (uid, EMPTY if none),
+8 columns lengths, then the cards of the columns (uids, EMPTY padded to 52)
+"""
+
+import os
+import mmap
+
+import src.model as m
+
+MAGIC = b"FCDK\x01\x00\x00\x00"
+EMPTY = 0xff
+RECORD = len(m.SUITS) + m.FREECELL + m.COLUMN + len(m.DECK)
+
+def encode(fcboard):
+    """ record (bytes) of a FCBoard """
+    record = bytearray(len(fcboard.bases[k]) for k in m.SUITS)
+    fc = [c.uid for c in fcboard.freecells]
+    record.extend(fc + [EMPTY] * (m.FREECELL - len(fc)))
+    record.extend(len(col) for col in fcboard.columns)
+    for col in fcboard.columns:
+        record.extend(c.uid for c in col)
+    record.extend([EMPTY] * (RECORD - len(record)))
+    return bytes(record)
+
+def decode(record):
+    """ FCBoard of a record """
+    bases = dict((k, [m.CARD_BY_UID[(n << 2) + i] for n in range(1, record[i] + 1)]) for i, k in enumerate(m.SUITS))
+    freecells = [m.CARD_BY_UID[uid] for uid in record[4:8] if uid != EMPTY]
+    columns = []
+    pos = 16
+    for n in record[8:16]:
+        columns.append([m.CARD_BY_UID[uid] for uid in record[pos:pos+n]])
+        pos += n
+    return m.FCBoard(freecells, bases, columns)
+
+def write_corpus(filename, boards):
+    """ write boards (iterable of FCBoard) to a corpus file, return the number of deals """
+    n = 0
+    with open(filename, "wb") as f:
+        f.write(MAGIC)
+        for fcboard in boards:
+            f.write(encode(fcboard))
+            n += 1
+    return n
+
+def is_corpus(filename):
+    if not os.path.isfile(filename):
+        return False
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+class Corpus(object):
+    """ Deals of a corpus file by index, decoded when accessed """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a corpus file" % filename)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._len = (len(self._mm) - len(MAGIC)) // RECORD
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("deal %d not in corpus %s" % (i, self.filename))
+        start = len(MAGIC) + i * RECORD
+        return decode(self._mm[start:start+RECORD])
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+    def close(self):
+        self._mm.close()
@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Cache of solutions by board state, for hints: each state along a solution is stored with
+the rest of the solution, so a hint from any position on it (or from the same position with
+columns in another order) is a lookup.
+"""
+
+import os
+import json
+import time
+import threading
+import collections
+
+import src.model as m
+import src.solvers as solver
+
+CACHE_ENTRIES = 100000
+HINT_BUDGET = 5.0
+
+class SolutionCache(object):
+    """
+    LRU cache of at most max_entries states (zhash), each one refers to a (shared) solution.
+    filename: JSON file, loaded if it exists and written by save()
+    """
+    def __init__(self, max_entries=CACHE_ENTRIES, filename=None):
+        self.max_entries = max_entries
+        self.filename = filename
+        self._entries = collections.OrderedDict() # {zhash: (columns keys, moves of the solution, next move index)}
+        if filename and os.path.exists(filename):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add(self, fcboard, moves, k):
+        key = fcboard.zhash
+        old = self._entries.get(key)
+        if old is None or len(old[1]) - old[2] > len(moves) - k:
+            self._entries[key] = (fcboard.position_key()[1:], moves, k)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def add_solution(self, fcboard, moves):
+        """ store all states of the solution moves from fcboard (a shorter known rest is kept) """
+        moves = tuple(moves)
+        game = fcboard.new_game()
+        self._add(game.fcboard, moves, 0)
+        for k, choice in enumerate(moves, 1):
+            game.apply(choice)
+            self._add(game.fcboard, moves, k)
+
+    def lookup(self, fcboard):
+        """ rest of a known solution from fcboard (moves for its columns), None if unknown """
+        entry = self._entries.get(fcboard.zhash)
+        if entry is None:
+            return None
+        columns, moves, k = entry
+        try:
+            perm = m.column_map(columns, fcboard.position_key()[1:])
+            rest = [m.remap_choice(c, perm) for c in moves[k:]]
+        except KeyError:
+            rest = None
+        if rest is None or not fcboard.validate(rest): # zhash collision
+            del self._entries[fcboard.zhash]
+            return None
+        self._entries.move_to_end(fcboard.zhash)
+        return rest
+
+    def solve(self, fcboard, budget=HINT_BUDGET, **kwargs):
+        """
+        Rest of a solution from fcboard: from the cache, or solved (and cached) in budget seconds
+        return: list of moves, None if not found in time
+        raise IndexError if fcboard is not solvable
+        kwargs: solver options
+        """
+        moves = self.lookup(fcboard)
+        if moves is not None:
+            return moves
+        deadline = time.time() + budget
+        solv = solver.Solver(fcboard, **kwargs)
+        while time.time() < deadline:
+            res = solv.solve()
+            if res[0]:
+                moves = solver.moves_reducer(fcboard, res[1])
+                self.add_solution(fcboard, moves)
+                return moves
+        return None
+
+    def save(self, filename=None):
+        """ write entries (in LRU order) & their solutions to a JSON file """
+        filename = filename or self.filename
+        solutions = {} # {id(moves): index in data["solutions"]}
+        data = {"solutions": [], "entries": []}
+        for key, (columns, moves, k) in self._entries.items():
+            i = solutions.get(id(moves))
+            if i is None:
+                i = solutions[id(moves)] = len(data["solutions"])
+                data["solutions"].append([[[c.uid for c in ch.cards], ch.col_orig, ch.col_dest] for ch in moves])
+            data["entries"].append([key, list(columns), i, k])
+        tmp = "%s.%d.tmp" % (filename, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, filename)
+
+    def load(self, filename=None):
+        with open(filename or self.filename) as f:
+            data = json.load(f)
+        solutions = [tuple(m.Choice([m.CARD_BY_UID[uid] for uid in uids], orig, dest) for uids, orig, dest in moves)
+                     for moves in data["solutions"]]
+        for key, columns, i, k in data["entries"]:
+            self._entries[key] = (tuple(columns), solutions[i], k)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class HintEngine(object):
+    """
+    Background solver (thread) of the current position, set by set_position when it is shown:
+    hints are ready (or the position known as lost) while the player thinks.
+    Solutions go to the SolutionCache: positions along them (after a move or an undo) are
+    lookups, dead ends found (Solver.noexit) are kept from one position to the next.
+    The position is checked between restarts of the solver.
+    """
+    def __init__(self, cache=None, **kwargs):
+        self.cache = cache if cache is not None else SolutionCache()
+        self.kwargs = kwargs # solver options
+        self._cond = threading.Condition()
+        self._board = None
+        self._version = 0 # incremented at each new position
+        self._lost = set() # zhash of positions found not solvable
+        self._noexit = set()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def set_position(self, fcboard):
+        """ no-op if fcboard is the current position (same position_key): its search goes on """
+        with self._cond:
+            if self._board is not None and self._board.position_key() == fcboard.position_key():
+                return
+            self._board = fcboard.clone()
+            self._version += 1
+            self._cond.notify_all()
+
+    def _known(self, fcboard):
+        """ rest of a solution from fcboard if known, raise IndexError if fcboard is lost (lock held) """
+        if fcboard.zhash in self._lost:
+            raise IndexError("position is lost")
+        return self.cache.lookup(fcboard)
+
+    def is_lost(self, fcboard):
+        with self._cond:
+            return fcboard.zhash in self._lost
+
+    def hint(self, fcboard, wait=0):
+        """
+        Rest of a solution from fcboard (the current position), waiting for the search at most wait seconds
+        return: list of moves, None if not found yet
+        raise IndexError if the position is lost
+        """
+        deadline = time.time() + wait
+        with self._cond:
+            moves = self._known(fcboard)
+            while moves is None and time.time() < deadline:
+                self._cond.wait(deadline - time.time())
+                moves = self._known(fcboard)
+        return moves
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _next_position(self, version):
+        """ wait for a position not known yet, different from version, return (board, version) or None to stop """
+        with self._cond:
+            while not self._stop:
+                if self._version != version:
+                    version = self._version
+                    try:
+                        if self._known(self._board) is None:
+                            return self._board, version
+                    except IndexError:
+                        pass
+                self._cond.wait()
+        return None
+
+    def _run(self):
+        version = 0
+        while True:
+            position = self._next_position(version)
+            if position is None:
+                return
+            board, version = position
+            solv = solver.Solver(board, **self.kwargs)
+            solv.noexit = self._noexit # dead ends found from previous positions
+            try:
+                while version == self._version and not self._stop:
+                    res = solv.solve()
+                    if res[0]:
+                        moves = solver.moves_reducer(board, res[1])
+                        with self._cond:
+                            self.cache.add_solution(board, moves)
+                            self._cond.notify_all()
+                        break
+            except IndexError:
+                with self._cond:
+                    self._lost.add(board.zhash)
+                    self._cond.notify_all()
@@ -5,6 +5,8 @@
 Describe a freecell game
 """
 
+import random
+
 RED = ["H", "D"]
 BLACK = ["S", "C"]
 SUITS = RED + BLACK
@@ -37,41 +39,168 @@ class Card(object):
         return self.uid
 
 DECK = [Card(j, i) for i in range(1, len(CARD_VALUE)+1) for j in SUITS]
+CARD_BY_UID = [None] * ((len(CARD_VALUE)+1) << 2)
+for _c in DECK:
+    CARD_BY_UID[_c.uid] = _c
+
+# {uid: uids of the cards that can be put on it (one lower, other color)}
+WANTED = dict((c.uid, tuple(((c.num-1) << 2) + SUITS.index(k) for k in (BLACK if c.is_red else RED)))
+              for c in DECK if c.num > 1)
+WANTED.update((c.uid, ()) for c in DECK if c.num == 1)
+
+def fits_on(card, other):
+    """ card can be put on other in a column """
+    return other.num - card.num == 1 and other.is_red != card.is_red
+
+# Zobrist keys (fixed seed: hashes must be the same between runs & processes)
+MASK64 = (1 << 64) - 1
+_zrand = random.Random(0xFC)
+ZKEY_COL = [[_zrand.getrandbits(64) for _ in range(56)] for _ in range(len(DECK))] # [depth][uid]
+ZKEY_FC = [_zrand.getrandbits(64) for _ in range(56)] # [uid]
+
+def zmix(h):
+    """ splitmix64 finalizer, makes the sum of column hashes independent of column order """
+    h = ((h ^ (h >> 30)) * 0xbf58476d1ce4e5b9) & MASK64
+    h = ((h ^ (h >> 27)) * 0x94d049bb133111eb) & MASK64
+    return h ^ (h >> 31)
+
+# column hash of freecells & bases in move keys, and its zmix
+MOVE_KEY = {COL_BASE: 1, COL_FC: 2}
+MOVE_KEY_MIX = dict((k, zmix(h)) for k, h in MOVE_KEY.items())
+
+def zcolumn(col):
+    h = 0
+    for j, c in enumerate(col):
+        h ^= ZKEY_COL[j][c.uid]
+    return h
 
 class FCBoard(object):
     def __init__(self, freecells, bases, columns):
         self.freecells = freecells  # list[4]
         self.bases = bases          # dict {suit: [cards]}
         self.columns = columns      # list[8][cards]
-        
+        self._init_zhash()
+
+    def _init_zhash(self):
+        # running zobrist hash, updated by apply (see compute_hash for the exact key)
+        self._col_zhash = [zcolumn(col) for col in self.columns]
+        self._col_zmix = [zmix(h) for h in self._col_zhash]
+        self._fc_zhash = 0
+        for c in self.freecells:
+            self._fc_zhash ^= ZKEY_FC[c.uid]
+        self._cols_zhash = sum(self._col_zmix) & MASK64
+        self.zhash = self._cols_zhash ^ self._fc_zhash
+
     def clone(self):
         f = list(self.freecells)
         b = dict((k, list(self.bases.get(k))) for k in SUITS)
         c = [list(self.columns[i]) for i in range(COLUMN)]
-        return FCBoard(f, b, c)
+        n = FCBoard.__new__(FCBoard)
+        n.freecells, n.bases, n.columns = f, b, c
+        n._col_zhash = list(self._col_zhash)
+        n._col_zmix = list(self._col_zmix)
+        n._fc_zhash = self._fc_zhash
+        n._cols_zhash = self._cols_zhash
+        n.zhash = self.zhash
+        return n
     
     def is_won(self):
         return sum([len(self.bases.get(k)) for k in SUITS]) == 52
 
+    def in_base(self):
+        return sum([len(self.bases.get(k)) for k in SUITS])
+
+    def bases_len(self):
+        return [len(self.bases.get(k)) for k in SUITS]
+
+    def nb_freecells(self):
+        return len(self.freecells)
+
+    def disorder(self):
+        """ number of cards above a lower card in their column """
+        n = 0
+        for col in self.columns:
+            low = len(CARD_VALUE) + 1
+            for c in col:
+                if c.num > low:
+                    n += 1
+                else:
+                    low = c.num
+        return n
+
+    def new_game(self):
+        return FCGame(self.clone())
+
+    def validate(self, moves):
+        """ moves are legal from this board and win the game """
+        game = self.new_game()
+        return game.replay(moves) == len(moves) and game.fcboard.is_won()
+
     def apply(self, choice):
         c0 = choice.cards[0]
 
         # From origin
         if choice.col_orig == COL_FC:
             self.freecells.remove(c0)
+            self._fc_zhash ^= ZKEY_FC[c0.uid]
         elif choice.col_orig == COL_BASE:
             self.bases.get(c0.suit).remove(c0)
         else:
+            col = self.columns[choice.col_orig]
+            h = self._col_zhash[choice.col_orig]
             for _ in choice.cards:
-                self.columns[choice.col_orig].pop()
+                h ^= ZKEY_COL[len(col)-1][col.pop().uid]
+            self._set_col_zhash(choice.col_orig, h)
         
         # To dest
         if choice.col_dest == COL_BASE:
             self.bases.get(c0.suit).append(c0)
         elif choice.col_dest == COL_FC:
             self.freecells.append(c0)
+            self._fc_zhash ^= ZKEY_FC[c0.uid]
         else:
-            self.columns[choice.col_dest].extend(choice.cards)
+            col = self.columns[choice.col_dest]
+            h = self._col_zhash[choice.col_dest]
+            for c in choice.cards:
+                h ^= ZKEY_COL[len(col)][c.uid]
+                col.append(c)
+            self._set_col_zhash(choice.col_dest, h)
+
+        self.zhash = self._cols_zhash ^ self._fc_zhash
+
+    def _set_col_zhash(self, col_id, h):
+        mixed = zmix(h)
+        self._cols_zhash = (self._cols_zhash - self._col_zmix[col_id] + mixed) & MASK64
+        self._col_zhash[col_id] = h
+        self._col_zmix[col_id] = mixed
+
+    def position_key(self):
+        """ key of the state that also depends on columns order (zhash does not) """
+        return (self._fc_zhash,) + tuple(self._col_zhash)
+
+    def move_key(self, choice):
+        """
+        64 bits key of a move from the column hashes, in O(cards moved):
+        cards, and (unordered) origin column without the cards & destination column
+        """
+        cards_h = 0
+        if choice.col_orig == COL_FC or choice.col_orig == COL_BASE:
+            orig = MOVE_KEY_MIX[choice.col_orig]
+            for c in choice.cards:
+                cards_h ^= ZKEY_FC[c.uid]
+        else:
+            orig = self._col_zhash[choice.col_orig]
+            j = len(self.columns[choice.col_orig]) - len(choice.cards)
+            for c in choice.cards:
+                cards_h ^= ZKEY_FC[c.uid]
+                orig ^= ZKEY_COL[j][c.uid]
+                j += 1
+            orig = zmix(orig)
+
+        dest = MOVE_KEY_MIX.get(choice.col_dest)
+        if dest is None:
+            dest = self._col_zmix[choice.col_dest] # zmix cached by _set_col_zhash
+        return cards_h ^ ((orig + dest) & MASK64)
     
     @classmethod
     def init_from_deck(cls, deck):
@@ -82,6 +211,13 @@ class FCBoard(object):
             i = i+1 if i < COLUMN-1 else 0
         
         return cls([], dict((k, []) for k in SUITS), columns)
+
+    @classmethod
+    def init_from_seed(cls, gid):
+        deck = DECK[:]
+        randgen = random.Random(gid)
+        randgen.shuffle(deck)
+        return cls.init_from_deck(deck)
     
     def compute_hash(self):
         fc_bits = 0
@@ -102,6 +238,8 @@ class FCBoard(object):
     
     
 class Choice(object):
+    __slots__ = ("cards", "col_orig", "col_dest", "weight")
+
     def __init__(self, cards, col_orig, col_dest):
         self.cards = cards
         self.col_orig = col_orig
@@ -110,67 +248,66 @@ class Choice(object):
         self.weight = 0
     
     def get_reverse(self):
-        return Choice(self.cards, self.col_dest, self.col_orig)
+        return self.__class__(self.cards, self.col_dest, self.col_orig)
     
     def compute_hash(self, fcboard):
-        cards_bit = 0
-        for c in self.cards:
-            cards_bit += 1 << c.uid
-        
-        orig_bit = 0
-        if self.col_orig == COL_FC:
-            orig_bit = 2
-        else:
-            i = 0
-            for c in fcboard.columns[self.col_orig][:-len(self.cards)]:
-                orig_bit += c.uid << (i*6)
-                i += 1
-        
-        dest_bit = 0
-        if self.col_dest == COL_BASE:
-            dest_bit = 1
-        elif self.col_dest == COL_FC:
-            dest_bit = 2
-        else:
-            i = 0
-            for c in fcboard.columns[self.col_dest]:
-                dest_bit += c.uid << (i*6)
-                i += 1
-        
-        if dest_bit > orig_bit:
-            return (cards_bit, dest_bit, orig_bit)
-        else:
-            return (cards_bit, orig_bit, dest_bit)
+        """ identity of the move in moves_done: cards & contents of the 2 columns, same for the reverse move """
+        return fcboard.move_key(self)
     
     def equals(self, other):
         return other.cards == self.cards and other.col_orig == self.col_orig and other.col_dest == self.col_dest
 
 
+def column_map(target_cols, cols):
+    """
+    Column id in cols of each column of target, for the same columns in another order
+    target_cols, cols: column keys (e.g. FCBoard.position_key()[1:])
+    """
+    where = {}
+    for cid, h in enumerate(cols):
+        where.setdefault(h, []).append(cid)
+    return [where[h].pop() for h in target_cols]
+
+def remap_choice(choice, perm):
+    """ same move with columns ids mapped by perm (see column_map) """
+    orig = perm[choice.col_orig] if isinstance(choice.col_orig, int) else choice.col_orig
+    dest = perm[choice.col_dest] if isinstance(choice.col_dest, int) else choice.col_dest
+    return choice.__class__(choice.cards, orig, dest)
+
+
 class FCGame(object):
     def __init__(self, fcboard):
         self.fcboard = fcboard
 
-        # pre-compute columns serie, to not compute them every time!
-        self._column_series = [self._get_column_series(i) for i in range(COLUMN)]
+        # cards location, updated by apply: column (or COL_FC/COL_BASE) & index in column, by card uid
+        self._card_col = [None] * len(CARD_BY_UID)
+        self._card_idx = [0] * len(CARD_BY_UID)
+        for c in fcboard.freecells:
+            self._card_col[c.uid] = COL_FC
+        for k in SUITS:
+            for c in fcboard.bases[k]:
+                self._card_col[c.uid] = COL_BASE
+        for cid, col in enumerate(fcboard.columns):
+            for idx, c in enumerate(col):
+                self._card_col[c.uid] = cid
+                self._card_idx[c.uid] = idx
+
+        # pre-compute where columns serie start, to not compute them every time!
+        self._serie_start = [self._get_serie_start(i) for i in range(COLUMN)]
         self._last_max_mvt = 0
-    
-    def _get_column_series(self, col_id):
+
+    def _get_serie_start(self, col_id):
         col = self.fcboard.columns[col_id]
-        serie = []
-        last_card = None
-        for card in reversed(col):
-            # End serie if last card doesn't match
-            if last_card is not None:
-                if last_card.is_red == card.is_red or card.num - last_card.num != 1:
-                    break
-            serie.append(card)
-            last_card = card
-        serie.reverse()
-        return serie
-    
-    def _update_column_series(self, col_id):
-        if col_id != COL_FC and col_id != COL_BASE:
-            self._column_series[col_id] = self._get_column_series(col_id)
+        i = len(col) - 1
+        while i > 0 and fits_on(col[i], col[i-1]):
+            i -= 1
+        return max(i, 0)
+
+    def serie_len(self, col_id):
+        return len(self.fcboard.columns[col_id]) - self._serie_start[col_id]
+
+    def suit_index(self, card):
+        return SUITS.index(card.suit)
     
     def _compute_mvt_max(self):
         freecol = sum([len(col) == 0 for col in self.fcboard.columns])
@@ -184,6 +321,7 @@ class FCGame(object):
         choices = []
         # compute size of mvt allowed:
         max_mvt, max_mvt_empty = self._compute_mvt_max()
+        columns = self.fcboard.columns
 
         # Bases from freecell
         for c in self.fcboard.freecells:
@@ -192,7 +330,7 @@ class FCGame(object):
         
         # Columns
         for cid in range(COLUMN):
-            col = self._column_series[cid]
+            col = columns[cid]
             if len(col) > 0:
                 last_card = col[-1]
 
@@ -200,28 +338,16 @@ class FCGame(object):
                 if last_card.num == len(self.fcboard.bases[last_card.suit]) + 1:
                     choices.append(Choice([last_card], cid, COL_BASE))
 
-                # Search specific cards
-                if last_card.num > 1:
-                    wanted_is_red = not last_card.is_red
-                    wanted_num = last_card.num-1
-                    
-                    # from freecell
-                    for c in self.fcboard.freecells:
-                        if c.num == wanted_num and c.is_red == wanted_is_red:
-                            choices.append(Choice([c], COL_FC, cid))
-                            
-                    # from other col
-                    for cid2 in range(COLUMN):
-                        if cid == cid2:
-                            continue
-                        col2 = self._column_series[cid2]
-                        idx = 0
-                        for c in col2:
-                            if c.num == wanted_num and c.is_red == wanted_is_red:
-                                if (len(col2) - idx) <= max_mvt:
-                                    choices.append(Choice(col2[idx:], cid2, cid))
-                                break
-                            idx += 1
+                # Search specific cards (one lower, other color) from their location
+                for uid in WANTED[last_card.uid]:
+                    cid2 = self._card_col[uid]
+                    if cid2 == COL_FC:
+                        choices.append(Choice([CARD_BY_UID[uid]], COL_FC, cid))
+                    elif cid2 is not None and cid2 != COL_BASE and cid2 != cid:
+                        idx = self._card_idx[uid]
+                        col2 = columns[cid2]
+                        if idx >= self._serie_start[cid2] and (len(col2) - idx) <= max_mvt:
+                            choices.append(Choice(col2[idx:], cid2, cid))
                 
                 # to Freecell
                 if len(self.fcboard.freecells) < FREECELL:
@@ -235,13 +361,88 @@ class FCGame(object):
                 for cid2 in range(COLUMN):
                     if cid == cid2:
                         continue
-                    col2 = self._column_series[cid2]
-                    for j in range(max(0, len(col2)-max_mvt_empty), len(col2)):
+                    col2 = columns[cid2]
+                    for j in range(max(self._serie_start[cid2], len(col2)-max_mvt_empty), len(col2)):
                         choices.append(Choice(col2[j:], cid2, cid))
         
         return choices
 
+    def is_legal(self, choice):
+        """ choice is one of list_choices(), checked without listing them """
+        cards, orig, dest = choice.cards, choice.col_orig, choice.col_dest
+        n = len(cards)
+        if n == 0 or orig == dest or orig == COL_BASE:
+            return False
+        card = cards[0]
+        if orig == COL_FC:
+            if n != 1 or self._card_col[card.uid] != COL_FC:
+                return False
+        else:
+            col = self.fcboard.columns[orig]
+            if len(col) - n < self._serie_start[orig] or col[-n:] != cards:
+                return False
+
+        if dest == COL_BASE:
+            return n == 1 and card.num == len(self.fcboard.bases[card.suit]) + 1
+        if dest == COL_FC:
+            return n == 1 and orig != COL_FC and len(self.fcboard.freecells) < FREECELL
+        max_mvt, max_mvt_empty = self._compute_mvt_max()
+        col = self.fcboard.columns[dest]
+        if len(col) == 0:
+            return n <= max_mvt_empty
+        return n <= max_mvt and fits_on(card, col[-1])
+
+    def replay(self, moves):
+        """ Apply moves while they are legal, return the number of moves applied """
+        for i, choice in enumerate(moves):
+            if not self.is_legal(choice):
+                return i
+            self.apply(choice)
+        return len(moves)
+
     def apply(self, choice):
+        dest = choice.col_dest
+        if dest != COL_FC and dest != COL_BASE:
+            dest_len = len(self.fcboard.columns[dest])
         self.fcboard.apply(choice)
-        self._update_column_series(choice.col_orig)
-        self._update_column_series(choice.col_dest)
+
+        # update locations & series start of the 2 columns
+        orig = choice.col_orig
+        if orig != COL_FC and orig != COL_BASE:
+            if len(self.fcboard.columns[orig]) <= self._serie_start[orig]:
+                self._serie_start[orig] = self._get_serie_start(orig)
+
+        if dest == COL_FC or dest == COL_BASE:
+            self._card_col[choice.cards[0].uid] = dest
+        else:
+            col = self.fcboard.columns[dest]
+            for idx in range(dest_len, len(col)):
+                self._card_col[col[idx].uid] = dest
+                self._card_idx[col[idx].uid] = idx
+            if dest_len == 0:
+                self._serie_start[dest] = 0
+            elif not fits_on(col[dest_len], col[dest_len-1]):
+                self._serie_start[dest] = dest_len
+
+    def _safe_to_base(self, card, bases_len):
+        # safe: next in base, and no lower card of the other color can need it anymore
+        if card.num != bases_len[SUITS.index(card.suit)] + 1:
+            return False
+        other = BLACK if card.is_red else RED
+        return card.num <= 2 or min([bases_len[SUITS.index(k)] for k in other]) >= card.num - 1
+
+    def auto_to_base(self):
+        """ Apply all safe moves to base, return them (to undo: reverse them in reverse order) """
+        done = []
+        found = True
+        while found:
+            found = False
+            bases_len = self.fcboard.bases_len()
+            choices = [Choice([c], COL_FC, COL_BASE) for c in self.fcboard.freecells if self._safe_to_base(c, bases_len)]
+            choices.extend(Choice([col[-1]], cid, COL_BASE) for cid, col in enumerate(self.fcboard.columns)
+                           if len(col) > 0 and self._safe_to_base(col[-1], bases_len))
+            for choice in choices:
+                self.apply(choice)
+                done.append(choice)
+                found = True
+        return done
@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Portfolio solving: several randomized solvers on the same game in a process pool,
+the first solution found wins and the other workers are terminated.
+"""
+
+import random
+import multiprocessing
+
+import src.solvers as solver
+import src.store as store
+
+def _portfolio_worker(args):
+    fcboard, seed, engine, cache, time_budget, node_budget, kwargs = args
+    random.seed(seed)
+    states = store.StateStore(cache) if cache else None
+    solv = solver.ENGINES[engine](fcboard, store=states, **kwargs)
+    result = solver.solve_until(solv, time_budget, node_budget)
+    result["seed"] = seed
+    if states is not None:
+        states.save()
+    return result
+
+def portfolio_solve(fcboard, jobs=None, seed=None, engine="dfs", cache=None, time_budget=None, node_budget=None,
+                    **kwargs):
+    """
+    Run `jobs` solvers seeded seed, seed+1, ... (default: one per cpu, random seed)
+    cache: StateStore file, loaded by each worker and extended by the winner
+    time_budget, node_budget: budgets of each worker (see solvers.solve_until)
+    kwargs: solver options (hashing, autoplay...)
+    return: result of solvers.solve_until with the "seed" of its worker: the first solution
+            or proof the game is not solvable, else the timeout with the best max_in_base
+    """
+    jobs = jobs or multiprocessing.cpu_count()
+    if seed is None:
+        seed = random.randrange(1 << 30)
+    pool = multiprocessing.Pool(jobs)
+    try:
+        best = None
+        for result in pool.imap_unordered(_portfolio_worker, [(fcboard, seed+i, engine, cache, time_budget,
+                                                               node_budget, kwargs) for i in range(jobs)]):
+            if result["solved"] or result["unsolvable"]:
+                return result
+            if best is None or result["max_in_base"] > best["max_in_base"]:
+                best = result
+        return best
+    finally:
+        pool.terminate()
+        pool.join()
@@ -5,114 +5,148 @@
 Functions to read and write game files
 """
 
+import io
 import re
 import src.model as m
 
+# lower case card names ("ah", "10h", "qs"...) -> card
+CARD_BY_NAME = dict((c.name.lower(), c) for c in m.DECK)
+FULL_DECK_MASK = sum([1 << c.uid for c in m.DECK])
+
 def read_card(scard):
-    try:
-        ma = re.match("(\d+|[ajqk])([hdsc])", scard.lower())
-        suit = ma.group(2).upper()
-        num = int({"a": 1, "j": 11, "q": 12, "k": 13}.get(ma.group(1), ma.group(1)))
-        return m.Card(suit, num)
-    except IndexError:
+    c = CARD_BY_NAME.get(scard.lower())
+    if c is not None:
+        return c
+    ma = re.fullmatch(r"(\d+|[ajqk])([hdsc])", scard.lower())
+    if ma is None:
         raise ValueError("wrong format for card: %s" % scard)
+    num = int({"a": 1, "j": 11, "q": 12, "k": 13}.get(ma.group(1), ma.group(1)))
+    return m.Card(ma.group(2).upper(), num)
+
+def split_line(line, column_space):
+    """
+    Cards of a line (in one pass), '' for empty columns, padded to 8 columns:
+    a tab ends a column, column_space spaces in a row (between cards) is an empty column
+    """
+    ret = []
+    card = ""
+    spaces = 0
+    for ch in line.rstrip("\r\n"):
+        if ch == "\t":
+            ret.append(card)
+            card = ""
+            spaces = 0
+        elif ch == " ":
+            if card:
+                ret.append(card)
+                card = ""
+                spaces = 1
+            else:
+                spaces += 1
+                if spaces == column_space:
+                    ret.append("")
+                    spaces = 0
+        else:
+            card += ch
+            spaces = 0
+    ret.append(card)
+    ret = ret[:m.COLUMN]
+    ret.extend([""] * (m.COLUMN - len(ret)))
+    return ret
+
+def _column_space(headline):
+    """ width of a column, from the positions of the 4 bases in the headline """
+    starts = [ma.start() for ma in re.finditer(r"\S+", headline)]
+    if len(starts) < 4:
+        raise ValueError("Headline must contains 4 bases")
+    return max(1, (starts[-1] - starts[-4]) // 3)
+
+def _parse_board(lines):
+    """
+    Read one board from an iterator of lines, stop after its columns (empty line or end)
+    return: FCBoard, or None if there are no more boards
+    """
+    line = next(lines, None)
+    while line is not None and len(line.strip()) == 0:
+        line = next(lines, None)
+    if line is None:
+        return None
 
-def load_from_file(filename):
-    print("Load board from file:", filename)
     freecells = list()
     bases = dict((k, []) for k in m.SUITS)
     columns = [list() for _ in range(m.COLUMN)]
-
-    verification_deck = m.DECK[:]
-    def remove_from_verification(card):
-        try:
-            verification_deck.remove(card)
-        except ValueError:
+    deck_mask = 0
+    def check(card):
+        nonlocal deck_mask
+        if deck_mask >> card.uid & 1:
             raise ValueError("Card %s is present twice" % card.name)
-    
-    column_space = "    "
-    def split_line(line, header=False):
-        l = line.replace('\n', '')
-
-        # measure column space from headline:
-        global column_space
-        if header:
-            try:
-                lsplited = l.split()
-                s = l.index(lsplited[-4])
-                e = l.rindex(lsplited[-1])
-                column_space = ""
-                for _ in range(int((e - s)/3)):
-                    column_space += " "
-            except:
-                raise ValueError("Headline must contains 4 bases")
-
-        # split cards from a line, col spaces empty or tab = col
-        ret = []
-        i = 0
-        j = 1
-        r = ""
-        while j <= len(l):
-            r = l[i:j]
-            if r == column_space:
-                ret.append('')
-                i = j
-            elif '\t' in r:
-                ret.append(r.strip())
-                i = j
-            elif len(r.strip()) > 0 and r[-1] == " ":
-                ret.append(r.strip())
-                i = j-1
-            j += 1
-        ret.append(r.strip())
-        # pad column so that it contains 8 cards
-        ret = ret[:8]
-        for _ in range(len(ret), 8):
-            ret.append('')
-        return ret
-    
-    with open(filename, 'r') as f:
-        line = f.readline()
-        headline_split = split_line(line, True)
-        assert all([hs for hs in headline_split[4:]]), "Headline must be containing the 4 bases, spaced accordingly after the freecells"
-        # Freecells
-        fcstr = headline_split[:4]
-        for sc in fcstr:
+        deck_mask |= 1 << card.uid
+
+    # Freecells & bases
+    column_space = _column_space(line)
+    headline_split = split_line(line, column_space)
+    if not all(headline_split[4:]):
+        raise ValueError("Headline must be containing the 4 bases, spaced accordingly after the freecells")
+    for sc in headline_split[:4]:
+        if sc:
+            c = read_card(sc)
+            freecells.append(c)
+            check(c)
+    for bs in headline_split[4:]:
+        if not bs.startswith('0'):
+            lbc = read_card(bs)
+            for n in range(1, lbc.num+1):
+                c = m.CARD_BY_UID[(n << 2) + m.SUITS.index(lbc.suit)]
+                bases[lbc.suit].append(c)
+                check(c)
+
+    # Second line must be empty
+    line = next(lines, "")
+    if len(line.strip()) != 0:
+        raise ValueError("line after freecells & bases must be empty")
+
+    # Columns, until an empty line
+    for line in lines:
+        if len(line.strip()) == 0:
+            break
+        for cid, sc in enumerate(split_line(line, column_space)):
             if sc:
                 c = read_card(sc)
-                freecells.append(c)
-                remove_from_verification(c)
-        # Bases
-        bstr = headline_split[4:]
-        for bs in bstr:
-            if not bs.startswith('0'):
-                lbc = read_card(bs)
-                for n in range(1, lbc.num+1):
-                    c = m.Card(lbc.suit, n)
-                    bases[lbc.suit].append(c)
-                    remove_from_verification(c)
-
-        # Second line must be empty
-        line = f.readline()
-        assert len(line.strip()) == 0, "line after freecells & bases must be empty"
-        print("freecell & bases, ok")
-
-        # Columns
-        line = f.readline()
-        while line:
-            cid = 0
-            for sc in split_line(line):
-                if sc:
-                    c = read_card(sc)
-                    columns[cid].append(c)
-                    remove_from_verification(c)
-                cid += 1
-            line = f.readline()
-    
-    assert len(verification_deck) == 0, "Missing some cards: %s" % ",".join([c.name for c in verification_deck])
-    print("Loaded Game is OK")   
+                columns[cid].append(c)
+                check(c)
+
+    if deck_mask != FULL_DECK_MASK:
+        missing = [c.name for c in m.DECK if not deck_mask >> c.uid & 1]
+        raise ValueError("Missing some cards: %s" % ",".join(missing))
     return m.FCBoard(freecells, bases, columns)
 
+def load_all_from_stream(stream):
+    """ Yield the boards of a text stream (boards separated by empty lines) """
+    lines = iter(stream)
+    board = _parse_board(lines)
+    while board is not None:
+        yield board
+        board = _parse_board(lines)
+
+def load_from_stream(stream):
+    """ First board of a text stream (file, sys.stdin...) """
+    board = _parse_board(iter(stream))
+    if board is None:
+        raise ValueError("No board found")
+    return board
+
+def load_from_string(text):
+    return load_from_stream(io.StringIO(text))
+
+def load_from_file(filename, verbose=False):
+    if verbose:
+        print("Load board from file:", filename)
+    with open(filename, 'r') as f:
+        board = load_from_stream(f)
+    if verbose:
+        print("Loaded Game is OK")
+    return board
+
 def save_to_file(filename, fcboard):
 
     def padCard(c_str):
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Scoring of the choices of a state with one weight vector over move features,
+for the whole choice list at once (dot product memoized by raw features).
+The CAT weights give the same order as Solver.choice_category, other weights
+(learned...) are loaded from a JSON file {"weights": {feature: weight}}.
+"""
+
+import json
+import random
+
+import src.model as m
+
+# Features of a choice (1/0 except deltas)
+FEATURES = [
+    "to_base",          # destination is a base
+    "base_reduce",      # to base, reduces the diff between highest and lowest base
+    "to_fc",            # destination is a freecell
+    "to_empty",         # destination is an empty column
+    "to_col",           # destination is a not empty column
+    "from_fc",          # origin is a freecell
+    "empty_col",        # origin column is emptied
+    "split_serie",      # origin serie is split
+    "fc_break",         # to freecell, emptying a column or splitting a serie
+    "empty_break",      # to empty column, from freecell or splitting a serie
+    "col_split",        # to not empty column, splitting a serie
+    "base_diff_delta",  # change of the diff between highest and lowest base
+    "mvt_delta",        # change of max cards movable at once
+]
+
+SCORING_CAT = "cat"
+
+def cat_weights(categories):
+    """ Solver.choice_category as weights, categories: values of CAT1-CAT4 (Solver.categories) """
+    cat1, cat2, cat3, cat4 = categories
+    return {"to_base": cat2, "base_reduce": cat1 - cat2, "to_fc": cat3, "to_empty": cat3, "to_col": cat2,
+            "fc_break": cat4 - cat3, "empty_break": cat4 - cat3, "col_split": cat3 - cat2}
+
+def load_weights(filename):
+    with open(filename) as f:
+        weights = json.load(f)["weights"]
+    for name in weights:
+        if name not in FEATURES:
+            raise ValueError("Unknown feature: %s" % name)
+    return weights
+
+class ChoiceScorer(object):
+    """
+    Scores of choices: features . weights + uniform noise in [-rfactor, rfactor]
+    weights: {feature: weight} (missing: 0, see cat_weights) or a weights file
+    """
+    def __init__(self, weights):
+        if not isinstance(weights, dict):
+            weights = load_weights(weights)
+        self.weights = [float(weights.get(name, 0)) for name in FEATURES]
+        self._memo = {} # {(raw features, free_fc, freecol): score}
+
+    def _base_diff_deltas(self, fcboard):
+        """ change of the bases diff for a card to the base of each suit (index) """
+        bases_len = fcboard.bases_len()
+        diff = max(bases_len) - min(bases_len)
+        deltas = []
+        for i in range(len(bases_len)):
+            bases_len[i] += 1
+            deltas.append(max(bases_len) - min(bases_len) - diff)
+            bases_len[i] -= 1
+        return deltas
+
+    def raw_features(self, choices, game):
+        """ [(to_base, to_fc, to_empty, from_fc, empty_col, split_serie, base_diff_delta)] of choices """
+        columns = game.fcboard.columns
+        deltas = None
+        rows = []
+        for c in choices:
+            orig, dest, n = c.col_orig, c.col_dest, len(c.cards)
+            from_fc = orig == m.COL_FC
+            empty_col = not from_fc and len(columns[orig]) == n
+            split_serie = not from_fc and game.serie_len(orig) > n
+            if dest == m.COL_BASE:
+                if deltas is None:
+                    deltas = self._base_diff_deltas(game.fcboard)
+                rows.append((1, 0, 0, from_fc, empty_col, split_serie, deltas[game.suit_index(c.cards[0])]))
+            elif dest == m.COL_FC:
+                rows.append((0, 1, 0, from_fc, empty_col, split_serie, 0))
+            else:
+                rows.append((0, 0, len(columns[dest]) == 0, from_fc, empty_col, split_serie, 0))
+        return rows
+
+    def _mvt(self, game):
+        """ (free freecells + 1, empty columns) of the current state """
+        freecol = sum([len(col) == 0 for col in game.fcboard.columns])
+        return 1 + m.FREECELL - game.fcboard.nb_freecells(), freecol
+
+    def _row_features(self, row, free_fc, freecol):
+        to_base, to_fc, to_empty, from_fc, empty_col, split, delta = row
+        to_col = 1 - to_base - to_fc - to_empty
+        return [to_base, int(to_base and delta < 0), to_fc, int(to_empty), to_col, int(from_fc), int(empty_col),
+                int(split), int(to_fc and (empty_col or split)), int(to_empty and (from_fc or split)),
+                int(to_col and split), delta,
+                (free_fc - to_fc + from_fc) * (1 + freecol + empty_col - to_empty) - free_fc * (1 + freecol)]
+
+    def scores(self, choices, game, rfactor=0):
+        """ scores of choices: dot product memoized by raw features (few distinct values) """
+        rows = self.raw_features(choices, game)
+        free_fc, freecol = self._mvt(game)
+        scores = []
+        memo = self._memo
+        for row in rows:
+            key = (row, free_fc, freecol)
+            score = memo.get(key)
+            if score is None:
+                score = memo[key] = sum([x * w for x, w in zip(self._row_features(row, free_fc, freecol), self.weights)])
+            scores.append(score + ((2*rfactor*random.random())-rfactor if rfactor else 0))
+        return scores
+
+    def sort(self, choices_list, game, rfactor=0):
+        """ sort [(choice, hash)] by score, best last """
+        scores = self.scores([x[0] for x in choices_list], game, rfactor)
+        order = sorted(range(len(scores)), key=scores.__getitem__)
+        choices_list[:] = [choices_list[i] for i in order]
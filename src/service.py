@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Local solver service (JSON over HTTP, on localhost or a Unix socket): warm pool of solver
+processes, per request time budget, cache of results by canonical board (compute_hash).
+
+POST /solve {"seed": 12} or {"board": "<save.py text format>"},
+            optional "budget" (s), "engine", "options" ({"hashing", "autoplay", "lazy", "restarts"})
+    -> {"solved", "unsolvable", "timeout", "moves": [{"cards", "from", "to"}], "max_in_base",
+        "restarts", "iterations", "cached", "time"}
+GET /stats -> {"requests", "cache_hits", "cached"}
+"""
+
+import os
+import json
+import time
+import threading
+import collections
+import multiprocessing
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import src.model as m
+import src.save as save
+import src.solvers as solver
+
+BUDGET = 10.0
+MAX_BUDGET = 300.0
+RESULT_GRACE = 5.0 # time to wait for a worker after the budget
+CACHE_SIZE = 10000
+SOLVER_OPTIONS = ["hashing", "autoplay", "lazy", "restarts"]
+
+def choice_to_dict(choice):
+    return {"cards": [c.name for c in choice.cards], "from": choice.col_orig, "to": choice.col_dest}
+
+def _solve_worker(args):
+    fcboard, budget, engine, options = args
+    solv = solver.ENGINES[engine](fcboard, **options)
+    result = solver.solve_until(solv, budget)
+    if result["solved"]:
+        result["moves"] = solver.moves_reducer(fcboard, result["moves"])
+    return result
+
+class SolverService(object):
+    """ Solve requests in a pool of `jobs` processes (default: one per cpu), with a LRU cache of results """
+    def __init__(self, jobs=None, budget=BUDGET, cache_size=CACHE_SIZE):
+        self.budget = budget
+        self.cache_size = cache_size
+        self.pool = multiprocessing.Pool(jobs or multiprocessing.cpu_count())
+        self._cache = collections.OrderedDict() # {compute_hash: (columns keys, result)}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def _cached(self, key):
+        with self._lock:
+            self.requests += 1
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._cache[key] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def solve(self, fcboard, budget=None, engine="dfs", options=None):
+        """ return: result (dict, JSON serializable), moves for the columns of fcboard """
+        start_time = time.time()
+        if engine not in solver.ENGINES:
+            raise ValueError("Unknown engine: %s" % engine)
+        options = dict(options or {})
+        for name in options:
+            if name not in SOLVER_OPTIONS:
+                raise ValueError("Unknown solver option: %s" % name)
+        budget = min(float(budget if budget is not None else self.budget), MAX_BUDGET)
+
+        key = fcboard.compute_hash()
+        columns = fcboard.position_key()[1:]
+        entry = self._cached(key)
+        cached = entry is not None
+        if cached:
+            result = dict(entry[1])
+            if result["moves"] is not None:
+                # same board with columns in another order
+                perm = m.column_map(entry[0], columns)
+                result["moves"] = [m.remap_choice(c, perm) for c in result["moves"]]
+        else:
+            job = self.pool.apply_async(_solve_worker, ((fcboard, budget, engine, options),))
+            try:
+                result = job.get(budget + RESULT_GRACE)
+            except multiprocessing.TimeoutError:
+                result = {"solved": False, "unsolvable": False, "timeout": True, "moves": None,
+                          "max_in_base": None, "restarts": None, "iterations": None}
+            if result["solved"] or result["unsolvable"]:
+                self._store(key, (columns, dict(result)))
+
+        result["cached"] = cached
+        if result["moves"] is not None:
+            result["moves"] = [choice_to_dict(c) for c in result["moves"]]
+        result["time"] = round(time.time() - start_time, 4)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "cache_hits": self.cache_hits, "cached": len(self._cache)}
+
+def parse_request(body):
+    """ return: (FCBoard, solve kwargs) of a JSON request body """
+    req = json.loads(body)
+    if "seed" in req:
+        fcboard = m.FCBoard.init_from_seed(int(req["seed"]))
+    elif "board" in req:
+        fcboard = save.load_from_string(req["board"])
+    else:
+        raise ValueError("a request needs a seed or a board")
+    return fcboard, {"budget": req.get("budget"), "engine": req.get("engine", "dfs"), "options": req.get("options")}
+
+class SolverRequestHandler(BaseHTTPRequestHandler):
+    def _reply(self, code, obj):
+        data = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._reply(200, self.server.service.stats())
+        else:
+            self._reply(404, {"error": "unknown path %s" % self.path})
+
+    def do_POST(self):
+        if self.path != "/solve":
+            self._reply(404, {"error": "unknown path %s" % self.path})
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            fcboard, kwargs = parse_request(body)
+            result = self.server.service.solve(fcboard, **kwargs)
+        except (ValueError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self._reply(200, result)
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service, port=None, unix_socket=None, verbose=False):
+    """ HTTP server of service, on localhost:port or on a Unix socket file """
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, SolverRequestHandler)
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), SolverRequestHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Solution shortening: shortcuts between states of a solution, found by a depth limited search
+"""
+
+import time
+
+import src.model as m
+
+SHORTCUT_DEPTH = 3
+TIME_BUDGET = 2.0
+
+def _explore(game, path, max_depth, index, visited, best, deadline):
+    """
+    Depth limited search of states of the solution, best: [k - depth, k, path] of the
+    reached state of the solution with the biggest gain. return True on timeout
+    """
+    if time.perf_counter() > deadline:
+        return True
+    timeout = False
+    for choice in game.list_choices():
+        game.apply(choice)
+        path.append(choice)
+        key = game.fcboard.zhash
+        depth = len(path)
+        if visited.get(key, max_depth + 1) > depth:
+            visited[key] = depth
+            k = index.get(key)
+            if k is not None and k - depth > best[0]:
+                best[:] = [k - depth, k, path[:]]
+            if depth < max_depth:
+                timeout = _explore(game, path, max_depth, index, visited, best, deadline)
+        path.pop()
+        game.apply(choice.get_reverse())
+        if timeout:
+            return True
+    return False
+
+def _shorten_pass(fcboard, moves, max_depth, deadline):
+    """ return: (new list of moves, True on timeout) """
+    # states of the solution: latest index by zhash, columns keys by index
+    game = fcboard.new_game()
+    index = {game.fcboard.zhash: 0}
+    columns = [game.fcboard.position_key()[1:]]
+    for k, mvt in enumerate(moves, 1):
+        game.apply(mvt)
+        index[game.fcboard.zhash] = k
+        columns.append(game.fcboard.position_key()[1:])
+
+    game = fcboard.new_game()
+    perm = list(range(len(columns[0]))) # solution column -> game column
+    nmoves = []
+    i = 0
+    timeout = False
+    while i < len(moves):
+        best = [i, index[game.fcboard.zhash], []]
+        if not timeout and best[1] == i:
+            timeout = _explore(game, [], max_depth, index, {game.fcboard.zhash: 0}, best, deadline)
+
+        if best[1] > i + len(best[2]):
+            for choice in best[2]:
+                game.apply(choice)
+            nmoves.extend(best[2])
+            i = best[1]
+            perm = m.column_map(columns[i], game.fcboard.position_key()[1:])
+        else:
+            choice = m.remap_choice(moves[i], perm)
+            game.apply(choice)
+            nmoves.append(choice)
+            i += 1
+
+    return nmoves, timeout
+
+def shorten(fcboard, moves, max_depth=SHORTCUT_DEPTH, time_budget=TIME_BUDGET):
+    """
+    From each state of the solution, search (up to depth moves) the latest state of the
+    solution that can be reached, and take the shortcut when it saves moves.
+    States are compared with zhash (columns in any order), next moves are mapped to the columns.
+    Passes of depth 1 to max_depth, until time_budget seconds: then the rest of the moves are kept.
+    return: new list of moves
+    """
+    deadline = time.perf_counter() + (time_budget if time_budget is not None else float("inf"))
+    for depth in range(1, max_depth + 1):
+        moves, timeout = _shorten_pass(fcboard, moves, depth, deadline)
+        if timeout:
+            break
+    return moves
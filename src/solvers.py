@@ -1,145 +1,716 @@
 #!/usr/bin/python3
 # -*- coding: utf-8 -*
 
+import time
+import json
+import heapq
 import random
 import src.model as model
+from src.stats import SolverStats
+from src.bounded import BoundedStateSet, EVICT_DEPTH, set_nbytes
+from src.spill import SpillStateSet
+import src.scoring as choice_scoring
 
 MAX_ITER = 5000
 
+# Priorities categories of choices:
+# 1) base & reduce base diff
+# 2) sorted inc & mvt_max (= or inc)
+# 3) other
+# 4) sorted = & mvt_max dec
+CAT1 = 10000
+CAT2 = 5
+CAT3 = 1
+CAT4 = 0
+CATEGORIES = [CAT1, CAT2, CAT3, CAT4]
+
+# Restart policies: nodes budget & noise of the choices weights for each call to solve (restart)
+RESTART_FIXED = "fixed"         # MAX_ITER nodes, noise = restart index (unbounded)
+RESTART_LUBY = "luby"           # unit * luby(restart + 1) nodes: 1 1 2 1 1 2 4 1 1 2 ...
+RESTART_GEOMETRIC = "geometric" # unit * GEOMETRIC_FACTOR ** restart nodes
+RESTARTS = [RESTART_FIXED, RESTART_LUBY, RESTART_GEOMETRIC]
+RESTART_UNIT = 500
+GEOMETRIC_FACTOR = 1.5
+NOISE_START = 0.4
+NOISE_STEP = 0.5
+MAX_NOISE = 4.0 # < CAT1 - CAT2: moves to base reducing base diff always first
+DEADLINE_CHECK = 256 # iterations between checks of the deadline
+
+def luby(i):
+    """ i-th term (from 1) of the Luby sequence """
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+class RestartPolicy(object):
+    """
+    Budget (iterations) & noise of each restart (index from 0) of Solver.
+    spec: "fixed", "luby", "geometric", optionally with the unit of nodes ("luby:500")
+    noise_start: noise of the first restart
+    """
+    def __init__(self, spec=RESTART_FIXED, noise_start=NOISE_START):
+        kind, _, unit = spec.partition(":")
+        if kind not in RESTARTS:
+            raise ValueError("Unknown restart policy: %s" % kind)
+        self.spec = spec
+        self.kind = kind
+        self.noise_start = noise_start
+        self.unit = int(unit) if unit else (MAX_ITER if kind == RESTART_FIXED else RESTART_UNIT)
+
+    def max_iter(self, restart):
+        if self.kind == RESTART_LUBY:
+            return self.unit * luby(restart + 1)
+        elif self.kind == RESTART_GEOMETRIC:
+            return int(self.unit * GEOMETRIC_FACTOR ** restart)
+        return self.unit
+
+    def noise(self, restart):
+        if self.kind == RESTART_FIXED:
+            return restart if restart > 0 else self.noise_start
+        return min(self.noise_start + NOISE_STEP * restart, MAX_NOISE)
+
+# Solver profile (see src/tuning.py): categories values, noise of the first restart, restart policy
+PROFILE_KEYS = ["categories", "noise_start", "restarts"]
+
+def load_profile(profile):
+    """ profile (dict of PROFILE_KEYS) from a dict or a JSON file, other keys are ignored """
+    if not isinstance(profile, dict):
+        with open(profile) as f:
+            profile = json.load(f)
+    profile = dict((k, profile[k]) for k in PROFILE_KEYS if k in profile)
+    if len(profile.get("categories", CATEGORIES)) != len(CATEGORIES):
+        raise ValueError("A profile needs %d categories values" % len(CATEGORIES))
+    return profile
+
+# State hashing modes
+HASH_EXACT = "exact"        # FCBoard.compute_hash, sorted tuple of columns
+HASH_ZOBRIST = "zobrist"    # FCBoard.zhash, 64 bits, maintained by apply
+HASH_CHECKED = "checked"    # zobrist, with exact key kept to detect collisions
+HASH_MODES = [HASH_EXACT, HASH_ZOBRIST, HASH_CHECKED]
+
 class Solver(object):
-    def __init__(self, fcboard):
+    def __init__(self, fcboard, hashing=HASH_EXACT, stats=False, autoplay=False, store=None,
+                 max_entries=None, eviction=EVICT_DEPTH, lazy=False, restarts=None, scoring=None, profile=None):
+        if hashing not in HASH_MODES:
+            raise ValueError("Unknown hashing mode: %s" % hashing)
+        if max_entries is not None and hashing != HASH_ZOBRIST:
+            raise ValueError("Bounded state sets need %s hashing" % HASH_ZOBRIST)
         self.fcboard = fcboard
-        self.noexit = set()
+        self.hashing = hashing
+        self.autoplay = autoplay # apply safe moves to base after each move
+        self.lazy = lazy # choices grouped by category, not sorted, hashed when taken
+        # profile: dict or file, restarts (spec or RestartPolicy) overrides its restart policy
+        profile = load_profile(profile) if profile is not None else {}
+        self.categories = tuple(profile.get("categories", CATEGORIES)) # values of CAT1-CAT4
+        if not isinstance(restarts, RestartPolicy):
+            restarts = RestartPolicy(restarts or profile.get("restarts", RESTART_FIXED),
+                                     profile.get("noise_start", NOISE_START))
+        self.restarts = restarts
+        # ChoiceScorer of sort_choices: "cat", weights file or {feature: weight}, None: choice_category
+        if scoring == choice_scoring.SCORING_CAT:
+            scoring = choice_scoring.cat_weights(self.categories)
+        self.scorer = None if scoring is None else choice_scoring.ChoiceScorer(scoring)
+        self.store = store # StateStore: dead ends & solvable states (followed) from previous runs
+        # state_seen & noexit sizes (entries each) if bounded
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self.noexit = set() if max_entries is None else BoundedStateSet(max_entries, policy=eviction)
+        self._state_seen = set() # of the last call to solve
         self.called = -1
+        self._zexact = {} # {zhash: exact hash} for HASH_CHECKED
+        self.last_iterations = 0 # iterations of the call to solve that raised IndexError
+        self.stats = [] if stats else None # [SolverStats] one per call to solve
+
+    def stats_dicts(self):
+        return [st.as_dict() for st in self.stats or []]
+
+    def memory_usage(self):
+        """ entries & bytes of noexit and of state_seen of the last call to solve """
+        return {"noexit": len(self.noexit), "noexit_bytes": set_nbytes(self.noexit),
+                "state_seen": len(self._state_seen), "state_seen_bytes": set_nbytes(self._state_seen)}
+
+    def state_key(self, fcboard):
+        if self.hashing == HASH_EXACT:
+            return fcboard.compute_hash()
+        zh = fcboard.zhash
+        if self.hashing == HASH_CHECKED:
+            # first state seen owns the zobrist key, colliding states use their exact key
+            exact = fcboard.compute_hash()
+            if self._zexact.setdefault(zh, exact) != exact:
+                return exact
+        return zh
     
+    def choice_category(self, choice, game):
+        cat1, cat2, cat3, cat4 = self.categories
+        # From 
+        from_fc = choice.col_orig == model.COL_FC
+        empty_col = not from_fc and len(game.fcboard.columns[choice.col_orig]) == len(choice.cards)
+        split_serie = not from_fc and game.serie_len(choice.col_orig) > len(choice.cards)
+
+        # To
+        if choice.col_dest == model.COL_BASE:
+            bases_len = game.fcboard.bases_len()
+            diff_bases = max(bases_len) - min(bases_len)
+
+            i = game.suit_index(choice.cards[0])
+            bases_len[i] += 1
+            new_diff_bases = max(bases_len) - min(bases_len)
+
+            if new_diff_bases < diff_bases:
+                return cat1
+            else:
+                return cat2
+        elif choice.col_dest == model.COL_FC:
+            if empty_col or split_serie:
+                return cat4
+            else:
+                return cat3
+        elif len(game.fcboard.columns[choice.col_dest]) == 0: # to empty col
+            if from_fc or split_serie:
+                return cat4
+            else:
+                return cat3
+        else: # to not empty col
+            if split_serie: # sorted =
+                return cat3
+            else: # sorted inc or max_mvt inc
+                return cat2
+
     def sort_choices(self, choices_list, game):
-        # Priorities categories:
-        # 1) base & reduce base diff
-        # 2) sorted inc & mvt_max (= or inc)
-        # 3) other
-        # 4) sorted = & mvt_max dec
-
-        CAT1 = 10000
-        CAT2 = 5
-        CAT3 = 1
-        CAT4 = 0
-        rfactor = self.called if self.called > 0 else 0.4
+        rfactor = self.restarts.noise(self.called)
+        if self.scorer is not None:
+            self.scorer.sort(choices_list, game, rfactor)
+            return
         
         for xchoice in choices_list:
             choice = xchoice[0]
             crand = (2*rfactor*random.random())-rfactor
+            choice.weight = self.choice_category(choice, game) + crand
+        
+        choices_list.sort(key=lambda x: x[0].weight)
 
-            # From 
-            from_fc = choice.col_orig == model.COL_FC
-            empty_col = not from_fc and len(game.fcboard.columns[choice.col_orig]) == len(choice.cards)
-            split_serie = not from_fc and len(game._column_series[choice.col_orig]) > len(choice.cards)
+    def _lazy_choices(self, game, list_choices, st=None):
+        """ Choices of the current state by category (shuffled), not hashed: best category last """
+        by_cat = dict((cat, []) for cat in self.categories)
+        all_choices = list_choices()
+        for c in all_choices:
+            by_cat[self.choice_category(c, game)].append(c)
+        if st is not None:
+            st.choices += len(all_choices) # filtered ones are removed when found
+        tiers = [by_cat[cat] for cat in sorted(by_cat) if len(by_cat[cat]) > 0]
+        for tier in tiers:
+            random.shuffle(tier)
+        if self._on_known_solution(game): # moves_done not checked, see solve
+            known = [[c for c in tier if self._leads_to_solvable(game, c)] for tier in tiers]
+            if sum([len(tier) for tier in known]) > 0:
+                tiers = [tier for tier in known if len(tier) > 0]
+        return tiers
 
-            # To
-            if choice.col_dest == model.COL_BASE:
-                bases_len = [len(game.fcboard.bases[k]) for k in model.SUITS]
-                diff_bases = max(bases_len) - min(bases_len)
+    def _on_known_solution(self, game):
+        """
+        the store has the current state on a solution of a previous run: only the choices
+        to solvable states are explored, the search stays on the known solutions states
+        """
+        return self.store is not None and self.store.is_solvable(game.fcboard.zhash)
 
-                i = model.SUITS.index(choice.cards[0].suit)
-                bases_len[i] += 1
-                new_diff_bases = max(bases_len) - min(bases_len)
+    def _leads_to_solvable(self, game, choice):
+        """ choice goes to a state on a known solution (store) """
+        game.apply(choice)
+        solvable = self.store.is_solvable(game.fcboard.zhash)
+        game.apply(choice.get_reverse())
+        return solvable
 
-                if new_diff_bases < diff_bases:
-                    choice.weight = CAT1 + crand
-                else:
-                    choice.weight = CAT2 + crand
-            elif choice.col_dest == model.COL_FC:
-                if empty_col or split_serie:
-                    choice.weight = CAT4 + crand
-                else:
-                    choice.weight = CAT3 + crand
-            elif len(game.fcboard.columns[choice.col_dest]) == 0: # to empty col
-                if from_fc or split_serie:
-                    choice.weight = CAT4 + crand
-                else:
-                    choice.weight = CAT3 + crand
-            else: # to not empty col
-                if split_serie: # sorted =
-                    choice.weight = CAT3 + crand
-                else: # sorted inc or max_mvt inc
-                    choice.weight = CAT2 + crand
-        
-        choices_list.sort(key=lambda x: x[0].weight)
+    def _next_lazy_choice(self, tiers, game, moves_done, st=None):
+        """ Next choice of a state from its tiers (game must be in this state), None if no more """
+        while len(tiers) > 0:
+            tier = tiers[-1]
+            while len(tier) > 0:
+                choice = tier.pop()
+                if st is not None:
+                    t = time.perf_counter()
+                chash = choice.compute_hash(game.fcboard)
+                if st is not None:
+                    st.times["choice_hash"] += time.perf_counter() - t
+                if chash not in moves_done:
+                    return choice, chash
+                if st is not None:
+                    st.filtered_choices += 1
+                    st.choices -= 1
+            tiers.pop()
+        return None
 
-    def solve(self):
+    def solve(self, max_iter=None, deadline=None):
         """
-        Navigate state to solution
+        Navigate state to solution, in at most the iterations of the restart policy
+        max_iter: cap on the iterations of this call
+        deadline: time (time.time()) to stop this call at
         return: True, list of moves
                 False, max in base
         """
         self.called += 1
+        limit = self.restarts.max_iter(self.called)
+        if max_iter is not None:
+            limit = min(limit, max_iter)
         # reset game
-        game = model.FCGame(self.fcboard.clone())
+        game = self.fcboard.new_game()
+
+        list_choices, apply, sort_choices = game.list_choices, game.apply, self.sort_choices
+        st = None
+        if self.stats is not None:
+            st = SolverStats()
+            self.stats.append(st)
+            list_choices = st.timed("list_choices", list_choices)
+            apply = st.timed("apply", apply)
+            sort_choices = st.timed("sort_choices", sort_choices)
 
-        moves = [] # [(choice, hash)]
+        root_moves = game.auto_to_base() if self.autoplay else []
+        moves = [] # [(choice, hash, [auto moves to base])]
         moves_done = set()
         states_choices = [] # [(hashst, [(choice, hash)])]: for each visited states, keep list of sorted choices
-        current_state = None # (hashst, [(choice, hash)])
-        state_seen = set()
+        current_state = None # (hashst, [(choice, hash)]), or (hashst, [[choice] by category]) in lazy mode
+        if self.max_entries is None:
+            state_seen = set()
+        else:
+            state_seen = BoundedStateSet(self.max_entries, policy=self.eviction)
+        self._state_seen = state_seen
 
         max_in_base = 0
         
         giter = 0
-        while giter < MAX_ITER:
+        while giter < limit:
             giter += 1        
+            if deadline is not None and giter % DEADLINE_CHECK == 0 and time.time() > deadline:
+                break
 
             # new state
             seen = False
             if current_state is None:
 
-                in_base = sum([len(game.fcboard.bases.get(k)) for k in model.SUITS])
+                in_base = game.fcboard.in_base()
                 if in_base == len(model.DECK):
-                    return True, [m[0] for m in moves], giter
+                    solution = list(root_moves)
+                    for m in moves:
+                        solution.append(m[0])
+                        solution.extend(m[2])
+                    if self.store is not None:
+                        self.store.add_solution(self.fcboard, solution)
+                    return True, solution, giter
                 max_in_base = max(max_in_base, in_base)
                 
-                hashst = game.fcboard.compute_hash()
-                if hashst in state_seen or hashst in self.noexit: # go back when state has already been seen 
+                hashst = self.state_key(game.fcboard)
+                if hashst in state_seen or hashst in self.noexit or \
+                        (self.store is not None and self.store.is_dead(game.fcboard.zhash)): # go back when state has already been seen 
                     current_state = (hashst, [])
                     seen = True
-                else:
-                    state_seen.add(hashst)
-
-                    all_choices = game.list_choices()
-                    viable_choices = [] # [(choice, hash)]
-                    for c in all_choices:
-                        chash = c.compute_hash(game.fcboard)
-                        if chash in moves_done:
-                            continue
+                    if st is not None:
+                        if hashst in state_seen:
+                            st.seen_hits += 1
                         else:
-                            viable_choices.append((c, chash))
+                            st.noexit_hits += 1
+                else:
+                    if self.max_entries is None:
+                        state_seen.add(hashst)
+                    else:
+                        state_seen.add(hashst, len(moves))
+
+                    if self.lazy:
+                        current_state = (hashst, self._lazy_choices(game, list_choices, st))
+                        if st is not None:
+                            st.nodes += 1
+                    else:
+                        all_choices = list_choices()
+                        if st is not None:
+                            t = time.perf_counter()
+                        viable_choices = [] # [(choice, hash)]
+                        for c in all_choices:
+                            chash = c.compute_hash(game.fcboard)
+                            if chash in moves_done:
+                                continue
+                            else:
+                                viable_choices.append((c, chash))
+                        if st is not None:
+                            st.times["choice_hash"] += time.perf_counter() - t
+                            st.nodes += 1
+                            st.choices += len(viable_choices)
+                            st.filtered_choices += len(all_choices) - len(viable_choices)
                     
-                    # random
-                    self.sort_choices(viable_choices, game)
-                    current_state = (hashst, viable_choices)
+                        if self._on_known_solution(game): # moves_done not checked: complete search of these states
+                            known = [(c, c.compute_hash(game.fcboard)) for c in all_choices
+                                     if self._leads_to_solvable(game, c)]
+                            if len(known) > 0:
+                                viable_choices = known
+
+                        # random
+                        sort_choices(viable_choices, game)
+                        current_state = (hashst, viable_choices)
             
             # go to next state
-            if len(current_state[1]) > 0:
+            choice = None
+            if self.lazy:
+                choice = self._next_lazy_choice(current_state[1], game,
+                                                () if self._on_known_solution(game) else moves_done, st)
+            elif len(current_state[1]) > 0:
                 choice = current_state[1].pop()
-                game.apply(choice[0])
-                moves.append(choice)
+            if choice is not None:
+                apply(choice[0])
+                autos = game.auto_to_base() if self.autoplay else ()
+                moves.append((choice[0], choice[1], autos))
                 moves_done.add(choice[1])
                 states_choices.append(current_state)
                 current_state = None
+                if st is not None:
+                    st.auto_moves += len(autos)
+                    if len(moves) > st.max_depth:
+                        st.max_depth = len(moves)
                 
             # go back
             else:
+                if st is not None:
+                    st.backtracks += 1
+                if not seen and self.store is not None:
+                    self.store.add_dead(game.fcboard.zhash)
+                if len(moves) == 0:
+                    self.last_iterations = giter
+                    raise IndexError("no more states to explore")
                 choice = moves.pop()
-                game.apply(choice[0].get_reverse())
+                for auto in reversed(choice[2]):
+                    apply(auto.get_reverse())
+                apply(choice[0].get_reverse())
                 moves_done.discard(choice[1])
                 if not seen: # go back cause no more choice
-                    self.noexit.add(current_state[0])
+                    if self.max_entries is None:
+                        self.noexit.add(current_state[0])
+                    else:
+                        self.noexit.add(current_state[0], len(moves) + 1)
                 current_state = states_choices.pop()
 
         return False, max_in_base, giter
 
-def moves_reducer(fcboard, moves):
-    game = model.FCGame(fcboard.clone())
+# Best-first search: f = depth + BF_WEIGHT * heuristic
+BF_WEIGHT = 2.0
+BF_MAX_STATES = 300000
+H_BASE = 1.0        # per card not in base
+H_DISORDER = 1.0    # per card above a lower card in its column
+H_DIFF = 0.5        # per card of difference between highest and lowest base
+H_MVT = 0.5         # per card movable at once
+
+class BestFirstSolver(Solver):
+    """
+    Weighted A* over board states, same interface as Solver: each call to solve
+    expands at most max_iter states and keeps the open/closed sets for the next call.
+    When more than max_states open states are stored, only the best max_states // 2 are kept,
+    and the search restarts from scratch if it runs out of states after that.
+    The closed set is bounded only with max_entries (BoundedStateSet, zobrist hashing).
+    """
+    def __init__(self, fcboard, hashing=HASH_EXACT, stats=False, autoplay=False, store=None,
+                 max_entries=None, eviction=EVICT_DEPTH, lazy=False, weight=BF_WEIGHT, max_iter=MAX_ITER,
+                 max_states=BF_MAX_STATES, restarts=None, scoring=None, profile=None):
+        # lazy, restarts, scoring, profile: dfs only, accepted for a common interface of ENGINES
+        super().__init__(fcboard, hashing, stats, autoplay, store, max_entries, eviction)
+        self.weight = weight
+        self.max_iter = max_iter
+        self.max_states = max_states
+        self._reset()
+
+    def _reset(self):
+        if self.max_entries is None:
+            self.closed = set()
+        else:
+            self.closed = BoundedStateSet(self.max_entries, policy=self.eviction)
+        self._state_seen = self.closed
+        self.open = [(0, 0, None, None)] # [(f, count, parent node, choice)], node = (board, parent node, moves, depth)
+        self._count = 0
+        self._pruned = False
+
+    def heuristic(self, game):
+        bases_len = game.fcboard.bases_len()
+        return H_BASE * (len(model.DECK) - sum(bases_len)) \
+            + H_DISORDER * game.fcboard.disorder() \
+            + H_DIFF * (max(bases_len) - min(bases_len)) \
+            - H_MVT * game._compute_mvt_max()[0]
+
+    def solve(self, max_iter=None, deadline=None):
+        """
+        max_iter: cap on the iterations of this call, deadline: time to stop this call at
+        return: True, list of moves
+                False, max in base
+        raise IndexError if all states have been explored (not solvable)
+        """
+        self.called += 1
+        limit = self.max_iter if max_iter is None else min(self.max_iter, max_iter)
+        st = None
+        if self.stats is not None:
+            st = SolverStats()
+            self.stats.append(st)
 
+        max_in_base = 0
+        giter = 0
+        while giter < limit:
+            if len(self.open) == 0:
+                if not self._pruned:
+                    self.last_iterations = giter
+                    raise IndexError("no more states to explore")
+                self._reset()
+                return False, max_in_base, giter
+            giter += 1
+            if deadline is not None and giter % DEADLINE_CHECK == 0 and time.time() > deadline:
+                break
+
+            _, _, parent, choice = heapq.heappop(self.open)
+            game = (self.fcboard if parent is None else parent[0]).new_game()
+            moves = [] # choice & safe moves to base
+            depth = 0
+            if choice is not None:
+                game.apply(choice)
+                moves.append(choice)
+                depth = parent[3] + 1
+            if self.autoplay:
+                moves.extend(game.auto_to_base())
+            hashst = self.state_key(game.fcboard)
+            if hashst in self.closed:
+                if st is not None:
+                    st.seen_hits += 1
+                continue
+            if self.max_entries is None:
+                self.closed.add(hashst)
+            else:
+                self.closed.add(hashst, depth)
+            node = (game.fcboard.clone(), parent, moves, depth)
+
+            in_base = game.fcboard.in_base()
+            if in_base == len(model.DECK):
+                solution = []
+                while node is not None:
+                    solution[:0] = node[2]
+                    node = node[1]
+                if self.store is not None:
+                    self.store.add_solution(self.fcboard, solution)
+                return True, solution, giter
+            max_in_base = max(max_in_base, in_base)
+
+            # children are evaluated in place (apply, reverse) and only stored as (parent, choice)
+            choices = game.list_choices()
+            for c in choices:
+                game.apply(c)
+                autos = game.auto_to_base() if self.autoplay else ()
+                if self.state_key(game.fcboard) not in self.closed:
+                    self._count += 1
+                    if self.store is not None and self.store.is_solvable(game.fcboard.zhash):
+                        f = float("-inf") # on a known solution: expanded first
+                    else:
+                        f = depth + 1 + self.weight * self.heuristic(game)
+                    heapq.heappush(self.open, (f, self._count, node, c))
+                for auto in reversed(autos):
+                    game.apply(auto.get_reverse())
+                game.apply(c.get_reverse())
+            if st is not None:
+                st.nodes += 1
+                st.choices += len(choices)
+                st.max_depth = max(st.max_depth, depth)
+
+            if len(self.open) > self.max_states:
+                self.open = heapq.nsmallest(self.max_states // 2, self.open)
+                self._pruned = True
+
+        return False, max_in_base, giter
+
+# Exhaustive search: states explored per call to solve
+PROVE_ITER = 100000
+PROGRESS_STATES = 10000 # new states between progress calls of the exhaustive search
+
+class ExhaustiveSolver(Solver):
+    """
+    Complete depth-first search, to prove a game is not solvable: each reachable state is
+    explored once. Keys are canonical (columns & freecells in any order), with zobrist hashing
+    the closed set is a SpillStateSet (sorted runs of 8 bytes keys, on disk if spill_dir).
+    Safe moves to base are always applied: they never make a game unsolvable.
+    Each call to solve explores at most max_iter states and keeps its stack for the next call,
+    until a solution is found or IndexError is raised (all states explored: not solvable).
+    progress: called with progress_info() every progress_states new states, at the end of each
+              call to solve and before IndexError is raised
+    """
+    def __init__(self, fcboard, hashing=HASH_EXACT, stats=False, autoplay=True, store=None,
+                 max_entries=None, eviction=EVICT_DEPTH, lazy=False, max_iter=PROVE_ITER, spill_dir=None,
+                 progress=None, progress_states=PROGRESS_STATES, restarts=None, scoring=None, profile=None):
+        # restarts, scoring: accepted for a common interface of ENGINES, profile: categories order the children
+        if max_entries is not None:
+            raise ValueError("Exhaustive search needs a closed set without eviction")
+        super().__init__(fcboard, hashing, stats, True, store, profile=profile)
+        self.max_iter = max_iter
+        self.progress = progress
+        self.progress_states = progress_states
+        if hashing == HASH_ZOBRIST:
+            self.closed = SpillStateSet(spill_dir=spill_dir)
+        else:
+            self.closed = set()
+        self._state_seen = self.closed
+        self._game = None
+        self._start_time = time.time()
+
+    def _children(self, game):
+        """ choices of the current state, best category last (no noise: exhaustive anyway) """
+        choices = game.list_choices()
+        choices.sort(key=lambda c: self.choice_category(c, game))
+        return choices
+
+    def progress_info(self):
+        info = {"states": len(self.closed), "depth": len(self._path),
+                "open": sum([len(children) for children in self._stack]),
+                "closed_bytes": set_nbytes(self.closed), "time": round(time.time() - self._start_time, 2)}
+        if isinstance(self.closed, SpillStateSet):
+            info["disk_bytes"] = self.closed.disk_bytes()
+        return info
+
+    def _solution(self):
+        solution = list(self._root_moves)
+        for choice, autos in self._path:
+            solution.append(choice)
+            solution.extend(autos)
+        if self.store is not None:
+            self.store.add_solution(self.fcboard, solution)
+        return solution
+
+    def solve(self, max_iter=None, deadline=None):
+        """
+        max_iter: cap on the states explored by this call, deadline: time to stop this call at
+        return: True, list of moves
+                False, max in base (max_iter states explored)
+        raise IndexError if all states have been explored (not solvable)
+        """
+        self.called += 1
+        limit = self.max_iter if max_iter is None else min(self.max_iter, max_iter)
+        st = None
+        if self.stats is not None:
+            st = SolverStats()
+            self.stats.append(st)
+
+        if self._game is None:
+            self._game = self.fcboard.new_game()
+            self._root_moves = self._game.auto_to_base()
+            self._path = [] # [(choice, [auto moves to base])]
+            self.closed.add(self.state_key(self._game.fcboard))
+            if self._game.fcboard.is_won():
+                return True, self._solution(), 0
+            self._stack = [self._children(self._game)] # choices left, by depth
+        game, stack, path = self._game, self._stack, self._path
+
+        max_in_base = 0
+        giter = 0
+        while giter < limit:
+            if len(stack) == 0:
+                if self.store is not None:
+                    self.store.add_dead(self.fcboard.zhash)
+                self.last_iterations = giter
+                if self.progress is not None:
+                    self.progress(self.progress_info())
+                raise IndexError("all states explored: not solvable")
+
+            children = stack[-1]
+            if len(children) == 0:
+                # go back
+                stack.pop()
+                if len(path) > 0:
+                    choice, autos = path.pop()
+                    for auto in reversed(autos):
+                        game.apply(auto.get_reverse())
+                    game.apply(choice.get_reverse())
+                    if st is not None:
+                        st.backtracks += 1
+                continue
+
+            choice = children.pop()
+            game.apply(choice)
+            autos = game.auto_to_base()
+            hashst = self.state_key(game.fcboard)
+            if hashst in self.closed:
+                for auto in reversed(autos):
+                    game.apply(auto.get_reverse())
+                game.apply(choice.get_reverse())
+                if st is not None:
+                    st.seen_hits += 1
+                continue
+
+            giter += 1
+            self.closed.add(hashst)
+            path.append((choice, autos))
+            in_base = game.fcboard.in_base()
+            if in_base == len(model.DECK):
+                return True, self._solution(), giter
+            max_in_base = max(max_in_base, in_base)
+            stack.append(self._children(game))
+            if st is not None:
+                st.nodes += 1
+                st.choices += len(stack[-1])
+                st.auto_moves += len(autos)
+                st.max_depth = max(st.max_depth, len(path))
+            if self.progress is not None and giter % self.progress_states == 0:
+                self.progress(self.progress_info())
+            if deadline is not None and giter % DEADLINE_CHECK == 0 and time.time() > deadline:
+                break
+
+        if self.progress is not None and giter % self.progress_states != 0:
+            self.progress(self.progress_info())
+        return False, max_in_base, giter
+
+ENGINES = {"dfs": Solver, "bestfirst": BestFirstSolver, "exhaustive": ExhaustiveSolver}
+
+def solve_until(solv, time_budget=None, node_budget=None, max_restarts=None, progress=None):
+    """
+    Restart solv until a solution is found, the game is proved not solvable,
+    or a budget (seconds, iterations, restarts) is spent
+    progress: called with the result after each restart without solution
+    return: {"solved", "unsolvable", "timeout", "moves", "max_in_base" (best of all restarts),
+             "restarts", "iterations"}
+    """
+    deadline = time.time() + time_budget if time_budget is not None else None
+    result = {"solved": False, "unsolvable": False, "timeout": False, "moves": None,
+              "max_in_base": 0, "restarts": 0, "iterations": 0}
+    try:
+        while max_restarts is None or solv.called + 1 < max_restarts:
+            if (deadline is not None and time.time() > deadline) or \
+                    (node_budget is not None and result["iterations"] >= node_budget):
+                result["timeout"] = True
+                break
+            max_iter = node_budget - result["iterations"] if node_budget is not None else None
+            res = solv.solve(max_iter, deadline)
+            result["iterations"] += res[2]
+            result["restarts"] = solv.called + 1
+            if res[0]:
+                result["solved"] = True
+                result["moves"] = res[1]
+                result["max_in_base"] = len(model.DECK)
+                break
+            result["max_in_base"] = max(result["max_in_base"], res[1])
+            if progress is not None:
+                progress(result)
+    except IndexError:
+        result["unsolvable"] = True
+        result["iterations"] += solv.last_iterations
+    result["restarts"] = solv.called + 1
+    return result
+
+def _undo(game, done):
+    for choice in reversed(done):
+        game.apply(choice.get_reverse())
+
+def moves_reducer(fcboard, moves):
+    """
+    Merge 2 moves of the same cards (A->B ... B->C gives A->C) when all the next moves stay legal.
+    Tries are applied on one game and reversed, a try stops as soon as it is back
+    on the state of the original moves.
+    """
+    game = fcboard.new_game()
     nmoves = moves[:]
+
+    # hashes[k]: key of the state before nmoves[k]
+    hashes = [game.fcboard.position_key()]
+    for mvt in nmoves:
+        game.apply(mvt)
+        hashes.append(game.fcboard.position_key())
+    _undo(game, nmoves)
+
     i = 0
     while i < len(nmoves):
         mvt = nmoves[i]
@@ -148,37 +719,35 @@ def moves_reducer(fcboard, moves):
         j = i+1
         while j < len(nmoves):
             if nmoves[j].cards == mvt.cards: # found possible replacement
-                nmvt = model.Choice(mvt.cards, mvt.col_orig, nmoves[j].col_dest)
-
-                ngame = model.FCGame(game.fcboard.clone())
-                impact = False
-                m = nmvt
-                k = i
-                while not impact and k < len(nmoves):
-                    possible = False
-                    for choice in ngame.list_choices():
-                        if choice.equals(m):
-                            possible = True
-                            break
-                    if possible:
-                        ngame.apply(m)
-                        k += 1
-                        if k == j: k += 1 # skip possible replacement
-                        if k < len(nmoves):
-                            m = nmoves[k]
-                    else:
-                        impact = True
-                
-                if not impact:
+                nmvt = mvt.__class__(mvt.cards, mvt.col_orig, nmoves[j].col_dest)
+
+                done = []
+                new_hashes = []
+                legal = True
+                for k, m in enumerate([nmvt] + nmoves[i+1:j] + nmoves[j+1:], i):
+                    if not game.is_legal(m):
+                        legal = False
+                        break
+                    game.apply(m)
+                    done.append(m)
+                    new_hashes.append(game.fcboard.position_key())
+                    if k >= j-1 and new_hashes[-1] == hashes[k+2]:
+                        # same state as with the original moves: next ones are legal
+                        new_hashes.extend(hashes[k+3:])
+                        break
+                _undo(game, done)
+
+                if legal:
                     nmoves[i] = nmvt
                     del nmoves[j]
+                    hashes[i+1:] = new_hashes
+                    mvt = nmvt
                 else:
                     break
-            j += 1
-        
+            else:
+                j += 1
+
         game.apply(nmoves[i])
         i += 1
 
     return nmoves
-    
-
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Set of states (64-bit zobrist keys) without eviction, for complete searches:
+new keys are kept in a python set, then flushed to sorted runs of keys (8 bytes each),
+in memory or spilled to files read through mmap.
+"""
+
+import os
+import sys
+import mmap
+import heapq
+import bisect
+import tempfile
+from array import array
+
+FLUSH_ENTRIES = 1 << 18
+MAX_RUNS = 8
+
+class SpillStateSet(object):
+    def __init__(self, flush_entries=FLUSH_ENTRIES, spill_dir=None):
+        self.flush_entries = flush_entries
+        self.spill_dir = spill_dir # None: runs in memory
+        self._new = set()
+        self._runs = [] # sorted arrays of keys, or memoryviews of spilled runs
+        self._maps = [] # mmaps of spilled runs
+        self._count = 0 # keys in runs
+
+    def __len__(self):
+        return self._count + len(self._new)
+
+    def __contains__(self, key):
+        if key in self._new:
+            return True
+        for run in self._runs:
+            i = bisect.bisect_left(run, key)
+            if i < len(run) and run[i] == key:
+                return True
+        return False
+
+    def add(self, key):
+        """ key must not be in the set already """
+        self._new.add(key)
+        if len(self._new) >= self.flush_entries:
+            self.flush()
+
+    def flush(self):
+        """ new keys to a sorted run, runs are merged into one when there are more than MAX_RUNS """
+        if not self._new:
+            return
+        self._count += len(self._new)
+        run = array("Q", sorted(self._new))
+        self._new = set()
+        if len(self._runs) >= MAX_RUNS:
+            run = array("Q", heapq.merge(*(self._runs + [run])))
+            self.close()
+        self._runs.append(self._spill(run))
+
+    def _spill(self, run):
+        if self.spill_dir is None:
+            return run
+        fd, filename = tempfile.mkstemp(suffix=".keys", dir=self.spill_dir)
+        with os.fdopen(fd, "wb") as f:
+            run.tofile(f)
+        with open(filename, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        os.remove(filename) # freed with its mmap
+        self._maps.append(mm)
+        return memoryview(mm).cast("Q")
+
+    def close(self):
+        """ free the runs (their keys are not in the set anymore) """
+        for run in self._runs:
+            if isinstance(run, memoryview):
+                run.release()
+        for mm in self._maps:
+            mm.close()
+        self._runs = []
+        self._maps = []
+
+    def nbytes(self):
+        """ memory used (not counting spilled runs) """
+        size = sys.getsizeof(self._new) + sum([sys.getsizeof(k) for k in self._new])
+        return size + sum([run.itemsize * len(run) for run in self._runs if isinstance(run, array)])
+
+    def disk_bytes(self):
+        return sum([len(mm) for mm in self._maps])
@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Counters & timers of a solver run (one restart)
+"""
+
+import time
+
+class SolverStats(object):
+    COUNTERS = ["nodes", "seen_hits", "noexit_hits", "filtered_choices", "choices", "backtracks", "max_depth",
+                "auto_moves"]
+    TIMERS = ["list_choices", "choice_hash", "sort_choices", "apply"]
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.times = dict((name, 0.0) for name in self.TIMERS)
+
+    def timed(self, name, func):
+        """ func wrapped to add its time to self.times[name] """
+        times = self.times
+        def wrapper(*args):
+            t = time.perf_counter()
+            ret = func(*args)
+            times[name] += time.perf_counter() - t
+            return ret
+        return wrapper
+
+    def as_dict(self):
+        d = dict((name, getattr(self, name)) for name in self.COUNTERS)
+        d["branching"] = self.choices / self.nodes if self.nodes else 0
+        d.update(("time_" + name, round(t, 6)) for name, t in self.times.items())
+        return d
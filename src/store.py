@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Persistent store of board states (by zobrist hash): dead ends found by the solver
+and states on a solution, shared between runs and processes.
+
+File: 8 bytes header, then sorted native uint64 keys, read through mmap.
+A key is the zobrist hash with its lowest bit replaced by the kind of state.
+"""
+
+import os
+import sys
+import mmap
+import fcntl
+import bisect
+from array import array
+
+MAGIC = b"FCST\x01" + sys.byteorder[0].encode() + b"\x00\x00"
+DEAD = 0
+SOLVABLE = 1
+
+class StateStore(object):
+    def __init__(self, filename=None):
+        self.filename = filename
+        self._mm = None
+        self._keys = array("Q") # sorted keys from file
+        self._new = set()       # keys added since load
+        self._load()
+
+    def _load(self):
+        if not self.filename or not os.path.exists(self.filename) or os.path.getsize(self.filename) <= len(MAGIC):
+            return
+        with open(self.filename, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a state store file" % self.filename)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._keys = memoryview(self._mm)[len(MAGIC):].cast("Q")
+
+    def _close(self):
+        if self._mm is not None:
+            self._keys.release()
+            self._mm.close()
+            self._mm = None
+        self._keys = array("Q")
+
+    def __len__(self):
+        return len(self._keys) + len(self._new)
+
+    def __contains__(self, key):
+        i = bisect.bisect_left(self._keys, key)
+        return (i < len(self._keys) and self._keys[i] == key) or key in self._new
+
+    def is_dead(self, zhash):
+        return (zhash & ~1) in self
+
+    def is_solvable(self, zhash):
+        return (zhash | 1) in self
+
+    def add_dead(self, zhash):
+        if not self.is_solvable(zhash):
+            self._new.add(zhash & ~1)
+
+    def add_solution(self, fcboard, moves):
+        """ mark all states from fcboard along moves as solvable """
+        game = fcboard.new_game()
+        self._new.add(game.fcboard.zhash | 1)
+        for choice in moves:
+            game.apply(choice)
+            self._new.add(game.fcboard.zhash | 1)
+            self._new.discard(game.fcboard.zhash & ~1)
+
+    def save(self):
+        """ Merge new keys into the file, with what other processes saved since load """
+        if not self._new:
+            return
+        with open(self.filename + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._close()
+            self._load()
+            keys = set(self._keys)
+            keys.update(self._new)
+            # a state on a solution is not a dead end
+            keys = array("Q", sorted(k for k in keys if k & 1 or (k | 1) not in keys))
+            self._close()
+
+            tmp = "%s.%d.tmp" % (self.filename, os.getpid())
+            with open(tmp, "wb") as f:
+                f.write(MAGIC)
+                keys.tofile(f)
+            os.replace(tmp, self.filename)
+            self._new = set()
+            self._load()
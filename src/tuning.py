@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+Tuning of the solver parameters (categories values, noise of the first restart, restart policy
+& its iterations) on a corpus of deals: configurations are evaluated in a worker pool, ranked by
+solve rate, PAR2 time (unsolved deals count twice the time budget) and p90 time to solve,
+the best one is saved as a solver profile (solve.py --profile).
+"""
+
+import json
+import random
+import itertools
+import multiprocessing
+
+import src.solvers as solver
+import src.batch as batch
+
+SEARCH_GRID = "grid"
+SEARCH_RANDOM = "random"
+SEARCH_LOCAL = "local"      # best configurations so far, one parameter changed at a time
+SEARCHES = [SEARCH_GRID, SEARCH_RANDOM, SEARCH_LOCAL]
+
+TIME_BUDGET = 10.0
+SAMPLES = 20
+LOCAL_ROUNDS = 3
+LOCAL_TOP = 3
+
+# values of each parameter (grid, neighbors of local search; random picks among them)
+SPACE = {
+    "cat1": [100, 1000, 10000],
+    "cat2": [2, 3, 5, 8],
+    "cat3": [0.5, 1, 2],
+    "cat4": [-1, 0, 0.5],
+    "noise_start": [0.1, 0.4, 1.0, 2.0],
+    "restarts": [solver.RESTART_FIXED, solver.RESTART_LUBY],
+    "max_iter": [500, 1000, 2000, 5000, 10000],
+}
+DEFAULT = {"cat1": solver.CAT1, "cat2": solver.CAT2, "cat3": solver.CAT3, "cat4": solver.CAT4,
+           "noise_start": solver.NOISE_START, "restarts": solver.RESTART_FIXED, "max_iter": solver.MAX_ITER}
+
+def to_profile(params):
+    """ solver profile (see solvers.load_profile) of a configuration """
+    return {"categories": [params["cat1"], params["cat2"], params["cat3"], params["cat4"]],
+            "noise_start": params["noise_start"],
+            "restarts": "%s:%d" % (params["restarts"], params["max_iter"])}
+
+def _key(params):
+    return tuple(sorted(params.items()))
+
+def grid_configs(space=SPACE):
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*[space[n] for n in names])]
+
+def random_configs(n, space=SPACE, rand=random):
+    return [dict((name, rand.choice(values)) for name, values in space.items()) for _ in range(n)]
+
+def neighbors(params, space=SPACE):
+    """ configurations with one parameter moved to the next lower or higher value """
+    configs = []
+    for name, values in space.items():
+        i = values.index(params[name]) if params[name] in values else None
+        for j in ([i-1, i+1] if i is not None else range(len(values))):
+            if 0 <= j < len(values):
+                configs.append(dict(params, **{name: values[j]}))
+    return configs
+
+def _quantile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0
+
+def summarize(records, time_budget):
+    """ solve_rate, mean/median/p90 time to solve (solved deals), PAR2 time of all deals """
+    solved = [r["search_time"] for r in records if r["solved"]]
+    par2 = [r["search_time"] if r["solved"] or r["unsolvable"] else 2 * time_budget for r in records]
+    return {"deals": len(records), "solved": len(solved),
+            "solve_rate": len(solved) / len(records) if records else 0,
+            "mean_time": sum(solved) / len(solved) if solved else None,
+            "median_time": _quantile(solved, 0.5) if solved else None,
+            "p90_time": _quantile(solved, 0.9) if solved else None,
+            "par2": sum(par2) / len(par2) if par2 else None,
+            "iterations": sum([r["iterations"] for r in records])}
+
+def rank_key(result):
+    """ higher solve rate, then lower PAR2 & p90 time first """
+    summary = result["summary"]
+    return (-summary["solve_rate"], summary["par2"], summary["p90_time"] or 0)
+
+def _tune_worker(args):
+    i, deal, kwargs = args
+    record = batch.solve_deal(deal, **kwargs)
+    return i, {"deal": deal, "solved": record["solved"], "unsolvable": record["unsolvable"],
+               "search_time": record["search_time"], "iterations": record["iterations"]}
+
+def evaluate(configs, deals, jobs=None, time_budget=TIME_BUDGET, seed=0, **kwargs):
+    """
+    Solve each deal with each configuration, all (configuration, deal) runs in a pool
+    of `jobs` processes (default: one per cpu), same random seed for each run
+    kwargs: other solver options (hashing, autoplay...)
+    return: [{"params", "profile", "summary"}] in configs order
+    """
+    profiles = [to_profile(params) for params in configs]
+    tasks = [(i, deal, dict(kwargs, profile=profile, time_budget=time_budget, seed=seed))
+             for i, profile in enumerate(profiles) for deal in deals]
+    records = [[] for _ in configs]
+    pool = multiprocessing.Pool(jobs or multiprocessing.cpu_count())
+    try:
+        for i, record in pool.imap_unordered(_tune_worker, tasks):
+            records[i].append(record)
+    finally:
+        pool.terminate()
+        pool.join()
+    return [{"params": params, "profile": profile, "summary": summarize(recs, time_budget)}
+            for params, profile, recs in zip(configs, profiles, records)]
+
+def parse_space(specs, space=SPACE):
+    """ copy of space with the values of some parameters replaced, specs: ["name=v1,v2"...] """
+    space = dict(space)
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in space:
+            raise ValueError("Unknown parameter: %s" % name)
+        space[name] = [v if name == "restarts" else float(v) if "." in v else int(v) for v in values.split(",")]
+    return space
+
+def tune(deals, search=SEARCH_RANDOM, samples=SAMPLES, rounds=LOCAL_ROUNDS, jobs=None,
+         time_budget=TIME_BUDGET, seed=0, space=SPACE, progress=None, **kwargs):
+    """
+    Search the best configuration on deals: grid of space, `samples` random configurations,
+    or local search from the default & `samples` random configurations (`rounds` rounds of
+    neighbors of the LOCAL_TOP best). The default configuration is always evaluated.
+    progress: called with the results of each evaluated batch of configurations
+    return: results (see evaluate) ranked, best first
+    """
+    if search not in SEARCHES:
+        raise ValueError("Unknown search: %s" % search)
+    rand = random.Random(seed)
+    if search == SEARCH_GRID:
+        configs = grid_configs(space)
+    else:
+        configs = random_configs(samples, space, rand)
+
+    results = {} # {params key: result}
+    def run(configs):
+        new = []
+        for params in [DEFAULT] + configs:
+            if _key(params) not in results and _key(params) not in [_key(p) for p in new]:
+                new.append(params)
+        if len(new) > 0:
+            evaluated = evaluate(new, deals, jobs, time_budget, seed, **kwargs)
+            results.update((_key(r["params"]), r) for r in evaluated)
+            if progress is not None:
+                progress(evaluated)
+
+    run(configs)
+    if search == SEARCH_LOCAL:
+        for _ in range(rounds):
+            best = sorted(results.values(), key=rank_key)[:LOCAL_TOP]
+            run([n for r in best for n in neighbors(r["params"], space)])
+    return sorted(results.values(), key=rank_key)
+
+def save_profile(filename, result, deals=None):
+    """ write the profile of a result, with its parameters & summary (ignored by load_profile) """
+    data = dict(result["profile"], params=result["params"], summary=result["summary"])
+    if deals is not None:
+        data["deals"] = len(deals)
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=1)
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+StateStore: a second solve of a deal follows the solvable states of the first one
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import src.model as m
+import src.solvers as solver
+import src.store as store
+
+class TestWarmStore(unittest.TestCase):
+    def _solve(self, filename, engine="dfs", **kwargs):
+        random.seed(0)
+        states = store.StateStore(filename)
+        solv = solver.ENGINES[engine](m.FCBoard.init_from_seed(0), hashing=solver.HASH_ZOBRIST, store=states,
+                                      **kwargs)
+        res = solver.solve_until(solv, node_budget=100000)
+        states.save()
+        self.assertTrue(res["solved"])
+        self.assertTrue(m.FCBoard.init_from_seed(0).validate(res["moves"]))
+        return res
+
+    def _check_warm(self, engine="dfs", **kwargs):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "states")
+            first = self._solve(filename, engine, **kwargs)
+            second = self._solve(filename, engine, **kwargs)
+        self.assertLess(second["iterations"], first["iterations"])
+        self.assertEqual(second["restarts"], 1)
+
+    def test_dfs(self):
+        self._check_warm(autoplay=True)
+
+    def test_dfs_lazy(self):
+        self._check_warm(autoplay=True, lazy=True)
+
+    def test_bestfirst(self):
+        self._check_warm("bestfirst")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*
+
+"""
+tune the solver parameters on a corpus of games, save the best ones as a solver profile
+"""
+
+import time
+import argparse
+
+import src.solvers as solver
+import src.batch as batch
+import src.tuning as tuning
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Tune the solver parameters on a corpus of games")
+    parser.add_argument("deals", nargs="+", help="seeds, seed ranges (0-99), game files, directories or corpus files")
+    parser.add_argument("-o", "--output", default="profile.json", help="profile (JSON) of the best configuration")
+    parser.add_argument("--search", default=tuning.SEARCH_RANDOM, choices=tuning.SEARCHES, help="search strategy")
+    parser.add_argument("--samples", type=int, default=tuning.SAMPLES,
+                        help="random configurations (random & local searches)")
+    parser.add_argument("--rounds", type=int, default=tuning.LOCAL_ROUNDS, help="rounds of the local search")
+    parser.add_argument("--space", action="append", default=[], metavar="NAME=V1,V2",
+                        help="values of a parameter (%s)" % ", ".join(sorted(tuning.SPACE)))
+    parser.add_argument("--time-budget", type=float, default=tuning.TIME_BUDGET, help="seconds per game")
+    parser.add_argument("--jobs", type=int, default=0, help="worker processes (0: one per cpu)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the solver & of the search")
+    parser.add_argument("--hash", default=solver.HASH_EXACT, choices=solver.HASH_MODES,
+                        help="state hashing mode")
+    parser.add_argument("--autoplay", action="store_true", help="apply safe moves to base after each move")
+    parser.add_argument("--top", type=int, default=10, help="configurations shown")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    deals = batch.parse_deals(args.deals)
+    space = tuning.parse_space(args.space)
+    results = tuning.tune(deals, args.search, args.samples, args.rounds, args.jobs, args.time_budget, args.seed,
+                          space, progress=lambda res: print("%d configurations evaluated" % len(res)),
+                          hashing=args.hash, autoplay=args.autoplay)
+
+    print("%-10s %-8s %-8s %-8s %-8s %s" % ("solve_rate", "par2", "mean", "median", "p90", "profile"))
+    for r in results[:args.top]:
+        su = r["summary"]
+        print("%-10.3f %-8.3f %-8.3f %-8.3f %-8.3f %s" % (su["solve_rate"], su["par2"], su["mean_time"] or 0,
+                                                          su["median_time"] or 0, su["p90_time"] or 0,
+                                                          r["profile"]))
+    tuning.save_profile(args.output, results[0], deals)
+    print("best profile in %s" % args.output)
+    print("--- runtime: %s seconds ---" % str(time.time() - start_time))